@@ -1,16 +1,50 @@
-from flask import Flask, request, jsonify, session, render_template, redirect, url_for
+from flask import Flask, Response, request, jsonify, session, render_template, redirect, url_for, send_file, abort
 from flask_sqlalchemy import SQLAlchemy
+import click
 from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import or_, case
-from collections import defaultdict
+from sqlalchemy import case, or_, tuple_, func, literal, bindparam, text as sa_text, inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from collections import defaultdict, Counter, OrderedDict, deque
+from functools import lru_cache
 import os
 import time
 import re
+import hashlib
+import codecs
+import zlib
+import gzip
+import base64
+import io
+import html
+import heapq
+import random
+import calendar
+import json
+import math
+import socket
+import uuid
+import atexit
 from urllib.parse import urlparse, urljoin
-from datetime import datetime
+from html.parser import HTMLParser
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
 import feedparser
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests as pyrequests
+from requests.adapters import HTTPAdapter
+try:
+    from PIL import Image, ImageOps  # 可选依赖：缩略图缩放与重新编码
+except Exception:
+    Image = None
+    ImageOps = None
+try:
+    import redis  # 可选依赖：多进程部署时共享 /api/news 响应缓存
+except Exception:
+    redis = None
 try:
     from dotenv import load_dotenv  # type: ignore
     load_dotenv()
@@ -51,6 +85,21 @@ class RSSItem(db.Model):
     published_at = db.Column(db.DateTime, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     view_count = db.Column(db.Integer, default=0)
+    view_sketch = db.Column(db.LargeBinary)  # 唯一访客的 HyperLogLog 草图（zlib 压缩）
+    # 近似去重：标题+摘要的 64 位 SimHash 及其 4 个 16 位分段（分段建索引用于候选查询）
+    simhash = db.Column(db.BigInteger)
+    simhash_band0 = db.Column(db.Integer, index=True)
+    simhash_band1 = db.Column(db.Integer, index=True)
+    simhash_band2 = db.Column(db.Integer, index=True)
+    simhash_band3 = db.Column(db.Integer, index=True)
+    alternate_links = db.Column(db.Text)  # 被合并的近似重复文章链接（JSON 数组）
+    # 入库时预处理的展示字段（image_url 为封面图）
+    thumbnail_url = db.Column(db.String(1024))
+    excerpt = db.Column(db.String(512))
+    summary_html = db.Column(db.Text)  # 清洗后的摘要 HTML
+    og_failed_at = db.Column(db.DateTime)  # 最近一次抓取 og:image 失败的时间（负缓存）
+    priority = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 入库时按来源规则计算的排序优先级
+    hot_score = db.Column(db.Float, nullable=False, default=0, server_default='0')  # 定期计算的热度分数（sort=hot）
 
     def to_dict(self):
         return {
@@ -61,15 +110,135 @@ class RSSItem(db.Model):
             'link': self.link,
             'summary': self.summary,
             'image_url': self.image_url,
+            'thumbnail_url': self.thumbnail_url,
+            'excerpt': self.excerpt,
             'published_at': self.published_at.isoformat() if self.published_at else None,
-            'view_count': self.view_count
+            'view_count': self.view_count,
+            'alternate_links': json.loads(self.alternate_links) if self.alternate_links else []
         }
 
+# 列表排序索引：与 /api/news 的 ORDER BY 完全一致，最新一页只需顺序读取索引
+db.Index('ix_rss_item_feed_order', RSSItem.priority.desc(), RSSItem.published_at.desc(), RSSItem.id.desc())
+db.Index('ix_rss_item_hot_order', RSSItem.hot_score.desc(), RSSItem.id.desc())
+
+class RSSItemAlias(db.Model):
+    """被合并到规范文章的近似重复条目，保留其 guid/link 以便后续抓取直接按精确键跳过。"""
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('rss_item.id'), nullable=False, index=True)
+    source = db.Column(db.String(255))
+    guid = db.Column(db.String(512), index=True)
+    link = db.Column(db.String(1024), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class SiteStats(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     total_visits = db.Column(db.Integer, default=0)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class FeedState(db.Model):
+    """每个 RSS 源的抓取状态：HTTP 条件请求校验器与缓存命中统计。"""
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(1024), unique=True, nullable=False)
+    etag = db.Column(db.String(512))
+    last_modified = db.Column(db.String(128))
+    content_hash = db.Column(db.String(64))
+    last_body_bytes = db.Column(db.Integer, default=0)
+    requests_total = db.Column(db.Integer, default=0)
+    not_modified_total = db.Column(db.Integer, default=0)
+    bytes_saved_total = db.Column(db.BigInteger, default=0)
+    # 自适应调度状态
+    poll_interval_seconds = db.Column(db.Integer)
+    next_poll_at = db.Column(db.DateTime)
+    last_polled_at = db.Column(db.DateTime)
+    last_success_at = db.Column(db.DateTime)
+    publish_rate = db.Column(db.Float)  # 估计的发布速率（条/秒）
+    avg_new_items = db.Column(db.Float, default=0.0)
+    hint_interval_seconds = db.Column(db.Integer)  # 源声明的 <ttl>/sy:updatePeriod
+    consecutive_failures = db.Column(db.Integer, default=0)
+    # 健康状态与熔断器
+    last_error = db.Column(db.String(300))
+    last_error_at = db.Column(db.DateTime)
+    latency_samples = db.Column(db.Text)  # 最近若干次抓取耗时（毫秒，JSON 数组）
+    bytes_fetched_total = db.Column(db.BigInteger, default=0)
+    # 镜像：校验器所属的镜像地址，以及各镜像的耗时统计（JSON）
+    validator_url = db.Column(db.String(1024))
+    mirror_stats = db.Column(db.Text)
+    breaker_state = db.Column(db.String(16), default='closed')  # closed / open / half_open
+    breaker_open_until = db.Column(db.DateTime)
+    breaker_trips = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def latency_percentiles(self):
+        try:
+            samples = sorted(json.loads(self.latency_samples or '[]'))
+        except ValueError:
+            samples = []
+        if not samples:
+            return {'p50': None, 'p90': None, 'p99': None}
+        def pct(p):
+            return samples[min(len(samples) - 1, int(math.ceil(p / 100 * len(samples))) - 1)]
+        return {'p50': pct(50), 'p90': pct(90), 'p99': pct(99)}
+
+    def health_dict(self):
+        return {
+            'url': self.url,
+            'breaker_state': self.breaker_state or 'closed',
+            'breaker_open_until': self.breaker_open_until.isoformat() if self.breaker_open_until else None,
+            'breaker_trips': self.breaker_trips or 0,
+            'consecutive_failures': self.consecutive_failures or 0,
+            'last_error': self.last_error,
+            'last_error_at': self.last_error_at.isoformat() if self.last_error_at else None,
+            'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+            'latency_ms': self.latency_percentiles(),
+            'bytes_fetched_total': self.bytes_fetched_total or 0,
+            'mirrors': json.loads(self.mirror_stats) if self.mirror_stats else {},
+        }
+
+    def to_dict(self):
+        requests_total = self.requests_total or 0
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'requests_total': requests_total,
+            'not_modified_total': self.not_modified_total or 0,
+            'hit_rate': round((self.not_modified_total or 0) / requests_total, 4) if requests_total else 0.0,
+            'bytes_saved_total': self.bytes_saved_total or 0,
+            'poll_interval_seconds': self.poll_interval_seconds,
+            'next_poll_at': self.next_poll_at.isoformat() if self.next_poll_at else None,
+            'last_polled_at': self.last_polled_at.isoformat() if self.last_polled_at else None,
+            'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+            'publish_rate_per_hour': round(self.publish_rate * 3600, 3) if self.publish_rate else 0.0,
+            'avg_new_items': round(self.avg_new_items or 0.0, 3),
+            'hint_interval_seconds': self.hint_interval_seconds,
+            'consecutive_failures': self.consecutive_failures or 0,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class FetcherLease(db.Model):
+    """抓取器租约：保证多进程/多主机部署时只有一个抓取器在运行。"""
+    name = db.Column(db.String(64), primary_key=True)
+    owner = db.Column(db.String(255))
+    expires_at = db.Column(db.DateTime)
+
+class ContentGeneration(db.Model):
+    """内容版本号：入库、补全封面等改变列表内容的写操作在同一事务中递增，响应缓存以此整体失效；
+    每篇文章的评论另有一个版本号（comments:<文章 id>），发表评论时递增。"""
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class FetchReport(db.Model):
+    """最近一轮抓取的耗时报告（JSON）。抓取器通常是独立进程，管理接口从这里读取而不是进程内变量。"""
+    name = db.Column(db.String(32), primary_key=True)
+    finished_at = db.Column(db.DateTime)
+    report = db.Column(db.Text)
+
+class ThumbnailSource(db.Model):
+    """缩略图地址 /thumb/<key> 对应的原图地址；只有登记过的原图才会被代理，避免成为开放代理。"""
+    key = db.Column(db.String(64), primary_key=True)
+    url = db.Column(db.String(1024), nullable=False)
+    failed_at = db.Column(db.DateTime)  # 最近一次下载/解码原图失败的时间（负缓存）
+
 class ArticleView(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('rss_item.id'), nullable=False)
@@ -78,6 +247,20 @@ class ArticleView(db.Model):
     
     __table_args__ = (db.UniqueConstraint('article_id', 'user_ip'),)
 
+class ArticleViewRollup(db.Model):
+    """按小时/按天汇总的文章浏览数（granularity 为 hour 或 day，bucket 为该时段的起始时间，UTC）。"""
+    granularity = db.Column(db.String(8), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    article_id = db.Column(db.Integer, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
+class SourceViewRollup(db.Model):
+    """按小时/按天汇总的来源浏览数。"""
+    granularity = db.Column(db.String(8), primary_key=True)
+    bucket = db.Column(db.DateTime, primary_key=True)
+    source = db.Column(db.String(255), primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey('rss_item.id'), nullable=False)
@@ -91,7 +274,10 @@ class Comment(db.Model):
     article = db.relationship('RSSItem', backref=db.backref('comments', lazy=True))
     parent = db.relationship('Comment', remote_side=[id], backref=db.backref('replies', lazy='select'))
 
-    def to_dict(self):
+    def to_dict(self, parent: 'Comment' = None):
+        """parent 为已加载的父评论时直接使用，避免再按关系懒加载一次。"""
+        if parent is None and self.parent_id:
+            parent = self.parent
         return {
             'id': self.id,
             'article_id': self.article_id,
@@ -100,19 +286,79 @@ class Comment(db.Model):
             'content': self.content,
             'created_at': self.created_at.isoformat(),
             'parent_id': self.parent_id,
-            'parent_username': self.parent.user.username if self.parent and self.parent.user else None,
-            'replies': []
+            'parent_username': parent.user.username if parent and parent.user else None,
         }
 
+# 评论楼层分页：顶层评论与某条评论的回复都按 (article_id, parent_id) 定位后按时间倒序读取
+db.Index('ix_comment_thread', Comment.article_id, Comment.parent_id, Comment.created_at, Comment.id)
+
 # RSS 源配置：可通过环境变量 RSS_FEED_URLS 设置，逗号分隔；默认使用少数派、掘金和腾讯新闻的RSS源
-DEFAULT_FEEDS = 'https://sspai.com/feed,https://rsshub.app/sspai/index?limit=50,https://rsshub.app/juejin/category/frontend?limit=50,https://rsshub.app/news/qq/news?limit=50'
-FEED_URLS = [u.strip() for u in os.environ.get('RSS_FEED_URLS', DEFAULT_FEEDS).split(',') if u.strip()]
+# 同一逻辑源的多个镜像用 | 分隔，抓取时竞速取最先返回的有效结果，第一个地址作为该源的标识
+DEFAULT_FEEDS = 'https://sspai.com/feed|https://rsshub.app/sspai/index?limit=50,https://rsshub.app/juejin/category/frontend?limit=50,https://rsshub.app/news/qq/news?limit=50'
+FEED_MIRRORS = {}
+for _group in os.environ.get('RSS_FEED_URLS', DEFAULT_FEEDS).split(','):
+    _mirrors = [u.strip() for u in _group.split('|') if u.strip()]
+    if _mirrors:
+        FEED_MIRRORS.setdefault(_mirrors[0], _mirrors)
+FEED_URLS = list(FEED_MIRRORS)
 RSS_ONLY_DOMAIN = os.environ.get('RSS_ONLY_DOMAIN', '').strip()
 
 # 抓取条数与间隔
 FETCH_LIMIT = int(os.environ.get('RSS_FETCH_LIMIT', '1000'))
 FETCH_INTERVAL_SECONDS = int(os.environ.get('RSS_FETCH_INTERVAL_SECONDS', '60'))  # 1分钟
 
+# 并发抓取：线程数、单源连接/读取超时（秒）、整轮抓取截止时间（秒）
+FETCH_MAX_WORKERS = int(os.environ.get('RSS_FETCH_MAX_WORKERS', '8'))
+FEED_CONNECT_TIMEOUT = float(os.environ.get('RSS_FEED_CONNECT_TIMEOUT', '5'))
+FEED_READ_TIMEOUT = float(os.environ.get('RSS_FEED_READ_TIMEOUT', '15'))
+FETCH_CYCLE_DEADLINE_SECONDS = float(os.environ.get('RSS_FETCH_CYCLE_DEADLINE_SECONDS', '45'))
+FEED_USER_AGENT = 'Mozilla/5.0 (compatible; NewsBoard/1.0; +https://github.com/jiyangnan/newsboard)'
+
+# 自适应调度：单源轮询间隔上下限、失败退避上限（秒），以及每次轮询期望拿到的新条目数
+FEED_MIN_INTERVAL_SECONDS = int(os.environ.get('RSS_FEED_MIN_INTERVAL_SECONDS', str(FETCH_INTERVAL_SECONDS)))
+FEED_MAX_INTERVAL_SECONDS = int(os.environ.get('RSS_FEED_MAX_INTERVAL_SECONDS', '3600'))
+FEED_MAX_BACKOFF_SECONDS = int(os.environ.get('RSS_FEED_MAX_BACKOFF_SECONDS', '3600'))
+FEED_TARGET_NEW_ITEMS = float(os.environ.get('RSS_FEED_TARGET_NEW_ITEMS', '2'))
+
+# 熔断器：连续失败多少次后熔断，熔断冷却时间（秒，半开探测失败后翻倍）及上限，保留的耗时样本数
+FEED_BREAKER_FAILURE_THRESHOLD = int(os.environ.get('RSS_FEED_BREAKER_FAILURES', '5'))
+FEED_BREAKER_COOLDOWN_SECONDS = int(os.environ.get('RSS_FEED_BREAKER_COOLDOWN_SECONDS', '600'))
+FEED_BREAKER_MAX_COOLDOWN_SECONDS = int(os.environ.get('RSS_FEED_BREAKER_MAX_COOLDOWN_SECONDS', '21600'))
+FEED_HEALTH_SAMPLES = 50
+
+# 镜像竞速：首个镜像在该时间（秒）内未返回有效结果时启动下一个镜像
+FEED_MIRROR_STAGGER_SECONDS = float(os.environ.get('RSS_FEED_MIRROR_STAGGER_SECONDS', '1.5'))
+
+# 近似去重：SimHash 汉明距离阈值（不超过3才能保证分段索引不漏检）、比对的时间窗口（天）、
+# 参与指纹计算的摘要字符数与 token 数上下限
+NEAR_DUP_MAX_DISTANCE = min(3, int(os.environ.get('RSS_NEAR_DUP_MAX_DISTANCE', '3')))
+NEAR_DUP_WINDOW_DAYS = int(os.environ.get('RSS_NEAR_DUP_WINDOW_DAYS', '7'))
+NEAR_DUP_SUMMARY_CHARS = 400
+NEAR_DUP_MIN_TOKENS = 8
+NEAR_DUP_MAX_TOKENS = 600
+
+# og:image 补全：后台线程数、最多排队的任务数、失败后多久（秒）才重试
+OG_ENRICH_WORKERS = int(os.environ.get('OG_ENRICH_WORKERS', '4'))
+OG_ENRICH_MAX_PENDING = int(os.environ.get('OG_ENRICH_MAX_PENDING', '200'))
+OG_RETRY_AFTER_SECONDS = int(os.environ.get('OG_RETRY_AFTER_SECONDS', '21600'))
+
+# 来源优先级规则：逗号分隔的 "关键词=优先级"，关键词不区分大小写地匹配来源名或链接，
+# 按顺序取第一条命中的规则，均未命中为 0；修改后运行 `flask --app app rerank-items` 重算旧数据
+DEFAULT_PRIORITY_RULES = 'sspai=1'
+SOURCE_PRIORITY_RULES = []
+for _rule in os.environ.get('RSS_PRIORITY_RULES', DEFAULT_PRIORITY_RULES).split(','):
+    _pattern, _, _value = _rule.partition('=')
+    if _pattern.strip():
+        try:
+            SOURCE_PRIORITY_RULES.append((_pattern.strip().lower(), int(_value.strip() or '0')))
+        except ValueError:
+            print(f"忽略无效的优先级规则: {_rule}")
+
+# 抓取线程共享的连接池（按 host 复用 keep-alive 连接）
+_feed_session = pyrequests.Session()
+_feed_session.mount('http://', HTTPAdapter(pool_maxsize=FETCH_MAX_WORKERS))
+_feed_session.mount('https://', HTTPAdapter(pool_maxsize=FETCH_MAX_WORKERS))
+
 def _parse_struct_time_to_datetime(struct_time_value):
     if not struct_time_value:
         return None
@@ -122,51 +368,1058 @@ def _parse_struct_time_to_datetime(struct_time_value):
     except Exception:
         return None
 
-def fetch_and_store_rss(limit: int = FETCH_LIMIT):
-    """抓取 RSS 源并存储至数据库（幂等插入）。"""
-    for feed_url in FEED_URLS:
+def _new_fetch_result(feed_url: str, status: str = 'ok', error: str = None):
+    return {
+        'url': feed_url,
+        'status': status,
+        'error': error,
+        'elapsed_ms': 0,
+        'bytes': 0,
+        'parsed': None,
+        'etag': None,
+        'last_modified': None,
+        'content_hash': None,
+        'retry_after': None,
+        'mirror': None,
+        'attempts': [],
+    }
+
+def _parse_retry_after(value: str):
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回秒数。"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0, int(retry_at.timestamp() - time.time()))
+    except Exception:
+        return None
+
+_SY_PERIOD_SECONDS = {'hourly': 3600, 'daily': 86400, 'weekly': 604800, 'monthly': 2592000, 'yearly': 31536000}
+
+def _feed_hint_seconds(parsed):
+    """从源声明的 <ttl>（分钟）与 sy:updatePeriod/sy:updateFrequency 推导建议的最短轮询间隔。"""
+    feed = getattr(parsed, 'feed', None) or {}
+    hints = []
+    try:
+        ttl = int(str(feed.get('ttl', '')).strip())
+        if ttl > 0:
+            hints.append(ttl * 60)
+    except ValueError:
+        pass
+    period = _SY_PERIOD_SECONDS.get(str(feed.get('sy_updateperiod', '')).strip().lower())
+    if period:
         try:
-            parsed = feedparser.parse(feed_url)
-        except Exception:
+            frequency = max(1, int(str(feed.get('sy_updatefrequency', '1')).strip()))
+        except ValueError:
+            frequency = 1
+        hints.append(period // frequency)
+    return max(hints) if hints else None
+
+def _entries_publish_rate(parsed):
+    """根据源内条目的发布时间估计发布速率（条/秒），用于首次轮询。"""
+    stamps = []
+    for entry in getattr(parsed, 'entries', []):
+        st = getattr(entry, 'published_parsed', None) or getattr(entry, 'updated_parsed', None)
+        if st:
+            try:
+                stamps.append(calendar.timegm(st))
+            except Exception:
+                pass
+    if len(stamps) < 2:
+        return None
+    span = max(stamps) - min(stamps)
+    return (len(stamps) - 1) / span if span > 0 else None
+
+def _fetch_feed(feed_url: str, deadline: float, validators: dict = None, cancel_event: threading.Event = None):
+    """抓取并解析单个 RSS 源（运行在抓取线程中，不访问数据库）。
+
+    validators 为上次成功抓取保存的 etag/last_modified/content_hash；
+    服务端返回 304 或内容哈希未变时跳过解析，status 分别为 not_modified/unchanged。
+    cancel_event 被置位时（镜像竞速已有结果）尽快放弃下载，status 为 cancelled。
+    """
+    started = time.monotonic()
+    result = _new_fetch_result(feed_url)
+    validators = validators or {}
+    headers = {'User-Agent': FEED_USER_AGENT}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    try:
+        resp = _feed_session.get(
+            feed_url,
+            headers=headers,
+            timeout=(FEED_CONNECT_TIMEOUT, FEED_READ_TIMEOUT),
+            stream=True,
+        )
+        try:
+            if resp.status_code in (429, 503):
+                result['retry_after'] = _parse_retry_after(resp.headers.get('Retry-After'))
+            if resp.status_code == 304:
+                result['status'] = 'not_modified'
+                result['elapsed_ms'] = int((time.monotonic() - started) * 1000)
+                return result
+            resp.raise_for_status()
+            # 逐块读取，单个源总耗时超过截止时间即放弃（read 超时只约束单次读取）
+            chunks = []
+            for chunk in resp.iter_content(chunk_size=16384):
+                if time.monotonic() > deadline:
+                    raise TimeoutError('feed deadline exceeded')
+                if cancel_event is not None and cancel_event.is_set():
+                    raise _FetchCancelled()
+                chunks.append(chunk)
+            body = b''.join(chunks)
+        finally:
+            resp.close()
+        result['bytes'] = len(body)
+        result['etag'] = resp.headers.get('ETag')
+        result['last_modified'] = resp.headers.get('Last-Modified')
+        result['content_hash'] = hashlib.sha1(body).hexdigest()
+        if result['content_hash'] == validators.get('content_hash'):
+            # 服务端不支持条件请求，但内容与上次一致，同样跳过解析
+            result['status'] = 'unchanged'
+        else:
+            result['parsed'] = feedparser.parse(body, response_headers=dict(resp.headers))
+    except _FetchCancelled:
+        result['status'] = 'cancelled'
+    except Exception as exc:
+        result['status'] = 'timeout' if isinstance(exc, (TimeoutError, pyrequests.Timeout)) else 'error'
+        result['error'] = str(exc)[:300]
+    result['elapsed_ms'] = int((time.monotonic() - started) * 1000)
+    return result
+
+class _FetchCancelled(Exception):
+    pass
+
+# 镜像竞速专用线程池（与按源并发的线程池分开，避免嵌套提交造成死锁）
+_mirror_executor = ThreadPoolExecutor(max_workers=max(2, FETCH_MAX_WORKERS * 2), thread_name_prefix='rss-mirror')
+
+def _is_good_result(res: dict) -> bool:
+    if res['status'] in ('not_modified', 'unchanged'):
+        return True
+    return res['status'] == 'ok' and bool(getattr(res['parsed'], 'entries', None))
+
+def _rank_mirrors(mirrors, stats: dict):
+    """按最近的平均耗时排序镜像，尚无统计的镜像保持配置顺序排在已知慢镜像之前。"""
+    def key(item):
+        index, url = item
+        return (stats.get(url, {}).get('ewma_ms', 0), index)
+    return [url for _, url in sorted(enumerate(mirrors), key=key)]
+
+def _fetch_feed_group(feed_key: str, mirrors, deadline: float, validators: dict = None, stats: dict = None):
+    """对同一逻辑源的多个镜像错峰竞速：优先请求最近最快的镜像，
+    超过 FEED_MIRROR_STAGGER_SECONDS 未返回或失败时再启动下一个，取第一个有效结果并取消其余请求。
+
+    validators 中的 etag/last_modified 只发给产生它们的镜像（validator_url），content_hash 对所有镜像有效。
+    """
+    validators = validators or {}
+
+    def mirror_validators(url):
+        if url == validators.get('validator_url'):
+            return validators
+        return {'content_hash': validators.get('content_hash')}
+
+    if len(mirrors) == 1:
+        res = _fetch_feed(mirrors[0], deadline, mirror_validators(mirrors[0]))
+        res['url'], res['mirror'] = feed_key, mirrors[0]
+        res['attempts'] = [{'mirror': mirrors[0], 'status': res['status'], 'elapsed_ms': res['elapsed_ms']}]
+        return res
+
+    started = time.monotonic()
+    order = _rank_mirrors(mirrors, stats or {})
+    cancel_event = threading.Event()
+    pending = {}
+    launched_at = {}
+    finished = []
+    winner = None
+    next_index = 0
+    while winner is None:
+        # 没有进行中的请求（上一个已失败）或错峰时间已到时，启动下一个镜像
+        if next_index < len(order):
+            url = order[next_index]
+            next_index += 1
+            launched_at[url] = time.monotonic()
+            pending[_mirror_executor.submit(_fetch_feed, url, deadline, mirror_validators(url), cancel_event)] = url
+        if not pending:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        timeout = min(FEED_MIRROR_STAGGER_SECONDS, remaining) if next_index < len(order) else remaining
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            res = future.result()
+            res['mirror'] = pending.pop(future)
+            finished.append(res)
+            if winner is None and _is_good_result(res):
+                winner = res
+    cancel_event.set()
+
+    attempts = [{'mirror': r['mirror'], 'status': r['status'], 'elapsed_ms': r['elapsed_ms']} for r in finished]
+    now = time.monotonic()
+    for url in pending.values():
+        # 比胜出镜像更早发出却仍未返回的镜像，其耗时至少为已等待的时间
+        slower = winner is not None and launched_at[url] <= launched_at[winner['mirror']]
+        attempts.append({
+            'mirror': url,
+            'status': 'cancelled',
+            'elapsed_ms': int((now - launched_at[url]) * 1000) if slower else None,
+        })
+    if winner is None:
+        winner = finished[-1] if finished else _new_fetch_result(feed_key, 'timeout', 'all mirrors timed out')
+        if winner['status'] == 'ok':
+            winner['status'], winner['error'], winner['parsed'] = 'error', 'no mirror returned entries', None
+    winner['url'] = feed_key
+    winner['attempts'] = attempts
+    winner['elapsed_ms'] = int((time.monotonic() - started) * 1000)
+    return winner
+
+def _fetch_feeds_concurrently(feed_urls, validators_by_url: dict = None, mirror_stats_by_url: dict = None):
+    """并发抓取所有源：每个源有独立的连接/读取超时，整轮有全局截止时间。"""
+    if not feed_urls:
+        return []
+    cycle_started = time.monotonic()
+    cycle_deadline = cycle_started + FETCH_CYCLE_DEADLINE_SECONDS
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(FETCH_MAX_WORKERS, len(feed_urls))),
+        thread_name_prefix='rss-fetch',
+    )
+    validators_by_url = validators_by_url or {}
+    mirror_stats_by_url = mirror_stats_by_url or {}
+    futures = {
+        executor.submit(
+            _fetch_feed_group, url, FEED_MIRRORS.get(url, [url]), cycle_deadline,
+            validators_by_url.get(url), mirror_stats_by_url.get(url),
+        ): url
+        for url in feed_urls
+    }
+    done, not_done = wait(futures, timeout=FETCH_CYCLE_DEADLINE_SECONDS)
+    # 不等待超时的抓取线程，避免拖慢整轮
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for future, url in futures.items():
+        if future in done:
+            results.append(future.result())
+        else:
+            res = _new_fetch_result(url, 'timeout', 'cycle deadline exceeded')
+            res['elapsed_ms'] = int((time.monotonic() - cycle_started) * 1000)
+            results.append(res)
+    return results
+
+# 批量查询时每条 SQL 绑定的 IN 参数个数；旧版 SQLite（< 3.32）单条语句最多 999 个参数，
+# 多行 INSERT 每行绑定多列，每批行数需按列数另算（见 _insert_chunk_size）
+_BULK_CHUNK_SIZE = 100
+_SQLITE_MAX_VARIABLES = 999
+
+def _chunked(values, size: int = _BULK_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def source_priority(source: str, link: str) -> int:
+    """按 SOURCE_PRIORITY_RULES 计算文章的排序优先级（与 _priority_expr 语义一致）。"""
+    source = (source or '').lower()
+    link = (link or '').lower()
+    for pattern, value in SOURCE_PRIORITY_RULES:
+        if pattern in source or pattern in link:
+            return value
+    return 0
+
+def _priority_expr():
+    """SOURCE_PRIORITY_RULES 对应的 SQL 表达式，用于批量重算 priority 列。"""
+    whens = [
+        (or_(func.lower(RSSItem.source).contains(pattern, autoescape=True),
+             func.lower(RSSItem.link).contains(pattern, autoescape=True)), value)
+        for pattern, value in SOURCE_PRIORITY_RULES
+    ]
+    return case(*whens, else_=0) if whens else literal(0)
+
+def rerank_items(batch_size: int = 5000) -> int:
+    """按当前规则重算所有文章的 priority，按 id 区间分批 UPDATE，只改动结果变化的行。"""
+    table = RSSItem.__table__
+    max_id = db.session.query(func.max(RSSItem.id)).scalar() or 0
+    expr = _priority_expr()
+    changed = 0
+    for start in range(0, max_id, batch_size):
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id > start, table.c.id <= start + batch_size)
+            .where(or_(table.c.priority.is_(None), table.c.priority != expr))
+            .values(priority=expr)
+        )
+        if result.rowcount:
+            bump_content_generation()
+        db.session.commit()
+        changed += result.rowcount or 0
+    return changed
+
+# 热度排序：分数 = (浏览数 + 评论权重 × 评论数 + 1) / (发布后小时数 + 2) ^ 重力系数，
+# 只为近 HOT_WINDOW_DAYS 天的文章定期重算，更早的文章热度为 0
+HOT_GRAVITY = float(os.environ.get('HOT_GRAVITY', '1.8'))
+HOT_COMMENT_WEIGHT = float(os.environ.get('HOT_COMMENT_WEIGHT', '3'))
+HOT_WINDOW_DAYS = int(os.environ.get('HOT_WINDOW_DAYS', '7'))
+
+def hot_score(view_count, comment_count, published_at, now: datetime = None) -> float:
+    now = now or datetime.utcnow()
+    if published_at is None:
+        return 0.0
+    age_hours = max(0.0, (now - published_at).total_seconds() / 3600)
+    points = (view_count or 0) + HOT_COMMENT_WEIGHT * (comment_count or 0) + 1
+    return points / (age_hours + 2) ** HOT_GRAVITY
+
+def update_hot_scores(batch_size: int = 1000) -> int:
+    """重算时间窗口内文章的热度分数并把窗口外的归零，返回重算的文章数。
+
+    与 rerank_items 一样逐批提交，不在整个重算期间占用写锁（SQLite 下会阻塞浏览写回与入库）；
+    内容版本号在全部批次完成后只递增一次。
+    """
+    now = datetime.utcnow()
+    since = now - timedelta(days=HOT_WINDOW_DAYS)
+    table = RSSItem.__table__
+    db.session.execute(
+        table.update().where(table.c.published_at < since).where(table.c.hot_score != 0).values(hot_score=0)
+    )
+    db.session.commit()
+    last_id = 0
+    total = 0
+    while True:
+        rows = (db.session.query(RSSItem.id, RSSItem.view_count, RSSItem.published_at)
+                .filter(RSSItem.published_at >= since, RSSItem.id > last_id)
+                .order_by(RSSItem.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+        comments = {}
+        for chunk in _chunked([r.id for r in rows]):
+            comments.update(db.session.query(Comment.article_id, func.count(Comment.id))
+                            .filter(Comment.article_id.in_(chunk))
+                            .group_by(Comment.article_id))
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(hot_score=bindparam('b_score')),
+            [{'b_id': r.id, 'b_score': hot_score(r.view_count, comments.get(r.id), r.published_at, now)} for r in rows]
+        )
+        db.session.commit()
+        last_id = rows[-1].id
+        total += len(rows)
+    bump_content_generation()
+    db.session.commit()
+    return total
+
+def _entry_to_row(entry, source: str):
+    """将 feedparser entry 转为 rss_item 行数据；缺少链接时返回 None。"""
+    link = getattr(entry, 'link', None)
+    if not link:
+        return None
+    title = getattr(entry, 'title', None) or '(无标题)'
+    summary = getattr(entry, 'summary', '')
+    guid = getattr(entry, 'id', None) or getattr(entry, 'guid', None) or link
+    published_dt = None
+    if hasattr(entry, 'published_parsed') and entry.published_parsed:
+        published_dt = _parse_struct_time_to_datetime(entry.published_parsed)
+    elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+        published_dt = _parse_struct_time_to_datetime(entry.updated_parsed)
+    if not published_dt:
+        published_dt = datetime.utcnow()
+    row = {
+        'source': source,
+        'guid': guid,
+        'title': title,
+        'link': link,
+        'summary': summary,
+        'published_at': published_dt,
+        'priority': source_priority(source, link),
+        'hot_score': hot_score(0, 0, published_dt),
+    }
+    row.update(process_item_content(title, summary, link, extract_image_from_entry(entry, None), source))
+    return row
+
+def _find_existing_keys(guids, links):
+    """集合查询已存在的 guid 与 link（分块 IN 查询，替代逐条 SELECT），包括已合并的近似重复条目。"""
+    seen_guids, seen_links = set(), set()
+    for model in (RSSItem, RSSItemAlias):
+        for chunk in _chunked(guids):
+            for guid, link in db.session.query(model.guid, model.link).filter(model.guid.in_(chunk)):
+                seen_guids.add(guid)
+                seen_links.add(link)
+        for chunk in _chunked(links):
+            for guid, link in db.session.query(model.guid, model.link).filter(model.link.in_(chunk)):
+                seen_guids.add(guid)
+                seen_links.add(link)
+    return seen_guids, seen_links
+
+NEWS_GENERATION = 'news'
+
+def bump_content_generation(name: str = NEWS_GENERATION):
+    """在当前事务中递增内容版本号，随调用方的 commit 一起生效。"""
+    _insert_rows(ContentGeneration.__table__, [{'name': name, 'value': 1}], increment='value', key_columns=('name',))
+
+def current_content_generation(name: str = NEWS_GENERATION) -> int:
+    return db.session.query(ContentGeneration.value).filter(ContentGeneration.name == name).scalar() or 0
+
+def _insert_chunk_size(rows) -> int:
+    """多行 INSERT 每批的行数，保证行数 × 列数不超过 _SQLITE_MAX_VARIABLES。"""
+    columns = len(rows[0]) if rows else 1
+    return max(1, min(_BULK_CHUNK_SIZE, _SQLITE_MAX_VARIABLES // columns))
+
+def _insert_rows(table, rows, increment: str = None, key_columns=(), returning=()):
+    """多行 INSERT ... ON CONFLICT（SQLite/Postgres）；其他数据库逐行插入并用保存点处理冲突。
+
+    increment 为空时跳过已存在的行；否则与已有行（按 key_columns 判断）冲突时把 increment 列累加上去。
+    returning 为列名序列时返回实际插入的行的这些列（仅用于跳过冲突的情形）。
+    """
+    inserted = []
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert_fn = sqlite_insert if dialect == 'sqlite' else pg_insert
+        for chunk in _chunked(rows, _insert_chunk_size(rows)):
+            stmt = insert_fn(table).values(chunk)
+            if increment:
+                stmt = stmt.on_conflict_do_update(index_elements=list(key_columns),
+                                                  set_={increment: table.c[increment] + stmt.excluded[increment]})
+            else:
+                stmt = stmt.on_conflict_do_nothing()
+            if returning:
+                inserted.extend(db.session.execute(stmt.returning(*[table.c[name] for name in returning])))
+            else:
+                db.session.execute(stmt)
+        return inserted
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(**row))
+            if returning:
+                inserted.append(tuple(row[name] for name in returning))
+        except IntegrityError:
+            if increment:
+                cond = [table.c[name] == row[name] for name in key_columns]
+                db.session.execute(table.update().where(*cond)
+                                   .values({increment: table.c[increment] + row[increment]}))
+    return inserted
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_TOKEN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\u3040-\u30ff\uac00-\ud7af]+|[a-z0-9]+')
+
+def _html_to_text(html_text: str) -> str:
+    """去除 HTML 标签与实体，合并空白。"""
+    if not html_text:
+        return ''
+    text = html.unescape(_TAG_RE.sub(' ', html_text))
+    return ' '.join(text.split())
+
+def _text_tokens(text: str, with_last_char: bool = False):
+    """分词：中日韩文字按字二元组切分，其余按字母数字单词切分（均转小写）。
+
+    with_last_char 为 True 时（搜索索引与查询）为每段中日韩文字补上末字单字，单字查询用前缀匹配即可全部命中。
+    """
+    tokens = []
+    for run in _TOKEN_RE.findall((text or '').lower()):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if with_last_char:
+                tokens.append(run[-1])
+    return tokens
+
+_SIMHASH_LANE_BITS = 16
+
+@lru_cache(maxsize=65536)
+def _simhash_token_lanes(token: str) -> int:
+    """把 token 的 64 位哈希展开为 64 个 16 位计数槽（第 i 位为 1 则第 i 槽为 1），便于用大整数加法并行累加。"""
+    h = int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+    lanes = 0
+    for i in range(64):
+        if (h >> i) & 1:
+            lanes |= 1 << (i * _SIMHASH_LANE_BITS)
+    return lanes
+
+def _simhash(text: str):
+    """计算文本的 64 位 SimHash（无符号）；有效 token 过少时返回 None，避免短文本误判。"""
+    weights = Counter(_text_tokens(text)[:NEAR_DUP_MAX_TOKENS])
+    if len(weights) < NEAR_DUP_MIN_TOKENS:
+        return None
+    total = 0
+    for token, weight in weights.items():
+        total += _simhash_token_lanes(token) * weight
+    threshold = sum(weights.values())
+    mask = (1 << _SIMHASH_LANE_BITS) - 1
+    value = 0
+    for i in range(64):
+        if 2 * ((total >> (i * _SIMHASH_LANE_BITS)) & mask) > threshold:
+            value |= 1 << i
+    return value
+
+def _item_fingerprint(title: str, summary: str):
+    text = (title or '') + ' ' + _html_to_text(summary or '')[:NEAR_DUP_SUMMARY_CHARS]
+    return _simhash(_URL_RE.sub(' ', text))
+
+def _simhash_bands(value: int):
+    return [(value >> (16 * i)) & 0xFFFF for i in range(4)]
+
+def _to_signed64(value: int) -> int:
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def _merge_near_duplicates(rows):
+    """为同一个源的一批新行计算指纹，并与其他来源的近期文章比对。
+
+    汉明距离不超过 NEAR_DUP_MAX_DISTANCE（≤3）时两个指纹必有一个 16 位分段完全相同，
+    因此只需按分段索引取候选，无需全表比对。只合并不同来源转载的同一文章：
+    同一个源的不同文章（guid 不同）即使内容相近也各自保留。返回 (保留的行, [(重复行, 规范文章 id)])。
+    """
+    for row in rows:
+        fp = _item_fingerprint(row['title'], row['summary'])
+        row['simhash'] = _to_signed64(fp) if fp is not None else None
+        for i, band in enumerate(_simhash_bands(fp) if fp is not None else [None] * 4):
+            row[f'simhash_band{i}'] = band
+
+    fingerprinted = [r for r in rows if r['simhash'] is not None]
+    candidates = {}
+    if fingerprinted:
+        cutoff = datetime.utcnow() - timedelta(days=NEAR_DUP_WINDOW_DAYS)
+        band_cols = [RSSItem.simhash_band0, RSSItem.simhash_band1, RSSItem.simhash_band2, RSSItem.simhash_band3]
+        for chunk in _chunked(fingerprinted, _BULK_CHUNK_SIZE // 4):
+            conds = [col.in_({r[f'simhash_band{i}'] for r in chunk}) for i, col in enumerate(band_cols)]
+            query = (db.session.query(RSSItem.id, RSSItem.simhash, RSSItem.source)
+                     .filter(or_(*conds), RSSItem.created_at >= cutoff))
+            for item_id, value, source in query:
+                candidates[item_id] = (value & ((1 << 64) - 1), source)
+
+    db_index = defaultdict(list)
+    for item_id, (value, source) in candidates.items():
+        for i, band in enumerate(_simhash_bands(value)):
+            db_index[(i, band)].append((item_id, value, source))
+
+    kept, merges = [], []
+    for row in rows:
+        if row['simhash'] is None:
+            kept.append(row)
             continue
+        value = row['simhash'] & ((1 << 64) - 1)
+        keys = [(i, band) for i, band in enumerate(_simhash_bands(value))]
+        canonical = None
+        for key in keys:
+            for item_id, other, source in db_index.get(key, []):
+                if source != row['source'] and bin(value ^ other).count('1') <= NEAR_DUP_MAX_DISTANCE:
+                    canonical = item_id
+                    break
+            if canonical is not None:
+                break
+        if canonical is None:
+            kept.append(row)
+        else:
+            merges.append((row, canonical))
+    return kept, merges
 
-        entries = list(getattr(parsed, 'entries', []))[:max(0, int(limit))]
-        for entry in entries:
-            title = getattr(entry, 'title', None) or '(无标题)'
-            link = getattr(entry, 'link', None)
-            summary = getattr(entry, 'summary', '')
-            guid = getattr(entry, 'id', None) or getattr(entry, 'guid', None) or link
-            published_dt = None
-            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                published_dt = _parse_struct_time_to_datetime(entry.published_parsed)
-            elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                published_dt = _parse_struct_time_to_datetime(entry.updated_parsed)
-            if not published_dt:
-                published_dt = datetime.utcnow()
-
-            if not link:
-                continue
+def _store_aliases(merges):
+    """记录被合并的近似重复条目，并把其链接追加到规范文章的 alternate_links。"""
+    alias_rows = [{'item_id': item_id, 'source': row['source'], 'guid': row['guid'], 'link': row['link']}
+                  for row, item_id in merges]
+    if not alias_rows:
+        return
+    _insert_rows(RSSItemAlias.__table__, alias_rows)
+    links_by_item = defaultdict(list)
+    for alias in alias_rows:
+        links_by_item[alias['item_id']].append(alias['link'])
+    for item in RSSItem.query.filter(RSSItem.id.in_(list(links_by_item))).all():
+        existing = json.loads(item.alternate_links) if item.alternate_links else []
+        existing.extend(link for link in links_by_item[item.id] if link not in existing)
+        item.alternate_links = json.dumps(existing, ensure_ascii=False)
 
-            exists = RSSItem.query.filter(or_(RSSItem.guid == guid, RSSItem.link == link)).first()
-            if exists:
-                continue
+# 全文搜索：SQLite 使用 FTS5 虚拟表，Postgres 使用 tsvector + GIN 索引；
+# 文本先在应用内分词（中日韩文字切为二元组）再交给数据库的简单分词器，两种后端行为一致
+SEARCH_FTS_TABLE = 'rss_item_fts'
+SEARCH_PG_TABLE = 'rss_item_search'
+SEARCH_BODY_CHARS = 20000
+SEARCH_SNIPPET_CHARS = 120
+_search_backend_cache = None  # None 为尚未检测，'' 为没有可用的索引表
 
-            image_url = extract_image_from_entry(entry, summary)
+def _search_document(title: str, summary: str):
+    body = _html_to_text(summary)[:SEARCH_BODY_CHARS]
+    return ' '.join(_text_tokens(title, with_last_char=True)), ' '.join(_text_tokens(body, with_last_char=True))
 
-            item = RSSItem(
-                source=parsed.feed.get('title', feed_url) if hasattr(parsed, 'feed') else feed_url,
-                guid=guid,
-                title=title,
-                link=link,
-                summary=summary,
-                image_url=image_url,
-                published_at=published_dt
+def ensure_search_index():
+    """按数据库类型创建搜索索引表，返回是否为本次新建（新建时需要为已有文章建索引）。"""
+    global _search_backend_cache
+    dialect = db.engine.dialect.name
+    table_name = {'sqlite': SEARCH_FTS_TABLE, 'postgresql': SEARCH_PG_TABLE}.get(dialect)
+    if table_name is None:
+        return False
+    if sa_inspect(db.engine).has_table(table_name):
+        return False
+    try:
+        with db.engine.begin() as conn:
+            if dialect == 'sqlite':
+                conn.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} USING fts5(title, body, tokenize='unicode61')"
+                )
+            else:
+                conn.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {SEARCH_PG_TABLE} ("
+                    f"item_id INTEGER PRIMARY KEY REFERENCES rss_item(id) ON DELETE CASCADE, "
+                    f"document TSVECTOR NOT NULL)"
+                )
+                conn.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_PG_TABLE}_document ON {SEARCH_PG_TABLE} USING GIN (document)"
+                )
+    except Exception as e:
+        print(f"创建搜索索引失败，搜索将退化为 LIKE 查询: {e}")
+        return False
+    _search_backend_cache = None
+    return True
+
+def _search_backend():
+    """当前可用的搜索后端：'fts5'、'tsvector'，不可用时为 None（退化为 LIKE 查询）。"""
+    global _search_backend_cache
+    if _search_backend_cache is None:
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite' and sa_inspect(db.engine).has_table(SEARCH_FTS_TABLE):
+            _search_backend_cache = 'fts5'
+        elif dialect == 'postgresql' and sa_inspect(db.engine).has_table(SEARCH_PG_TABLE):
+            _search_backend_cache = 'tsvector'
+        else:
+            _search_backend_cache = ''
+    return _search_backend_cache or None
+
+def index_items_for_search(items, replace: bool = True):
+    """在当前事务中写入/更新文章的搜索索引。items 为 (id, title, summary) 序列；
+    replace=False 时跳过删除旧索引行（仅用于清空后的全量重建）。"""
+    backend = _search_backend()
+    if backend is None:
+        return
+    params = []
+    for item_id, title, summary in items:
+        title_tokens, body_tokens = _search_document(title, summary)
+        params.append({'id': item_id, 'title': title_tokens, 'body': body_tokens})
+    for chunk in _chunked(params):
+        if backend == 'fts5':
+            if replace:
+                db.session.execute(sa_text(f"DELETE FROM {SEARCH_FTS_TABLE} WHERE rowid = :id"), chunk)
+            db.session.execute(
+                sa_text(f"INSERT INTO {SEARCH_FTS_TABLE}(rowid, title, body) VALUES (:id, :title, :body)"), chunk
             )
-            db.session.add(item)
+        else:
+            db.session.execute(sa_text(
+                f"INSERT INTO {SEARCH_PG_TABLE}(item_id, document) VALUES (:id, "
+                f"setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :body), 'B')) "
+                f"ON CONFLICT (item_id) DO UPDATE SET document = EXCLUDED.document"
+            ), chunk)
+
+def rebuild_search_index(batch_size: int = 500) -> int:
+    """清空并为所有文章重建搜索索引，按 id 分批提交。"""
+    backend = _search_backend()
+    if backend is None:
+        return 0
+    db.session.execute(sa_text(f"DELETE FROM {SEARCH_FTS_TABLE if backend == 'fts5' else SEARCH_PG_TABLE}"))
+    last_id = 0
+    total = 0
+    while True:
+        batch = (db.session.query(RSSItem.id, RSSItem.title, RSSItem.summary)
+                 .filter(RSSItem.id > last_id)
+                 .order_by(RSSItem.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        index_items_for_search(batch, replace=False)
+        db.session.commit()
+        last_id = batch[-1].id
+        total += len(batch)
+    return total
+
+def search_item_ids(query_text: str, offset: int, limit: int):
+    """按相关度返回 [(id, score)]，score 越大越相关。"""
+    tokens = list(dict.fromkeys(_text_tokens(query_text, with_last_char=True)))
+    if not tokens:
+        return []
+    backend = _search_backend()
+    # 单个中日韩字用前缀匹配（索引中只有以它开头的二元组或段末单字）
+    single_chars = {t for t in tokens if len(t) == 1 and not t.isascii()}
+    if backend == 'fts5':
+        match = ' '.join(f'"{t}"*' if t in single_chars else f'"{t}"' for t in tokens)
+        rows = db.session.execute(sa_text(
+            f"SELECT rowid, bm25({SEARCH_FTS_TABLE}, 4.0, 1.0) AS score FROM {SEARCH_FTS_TABLE} "
+            f"WHERE {SEARCH_FTS_TABLE} MATCH :match ORDER BY score, rowid DESC LIMIT :limit OFFSET :offset"
+        ), {'match': match, 'limit': limit, 'offset': offset})
+        return [(item_id, -score) for item_id, score in rows]
+    if backend == 'tsvector':
+        tsquery = ' & '.join(f'{t}:*' if t in single_chars else t for t in tokens)
+        rows = db.session.execute(sa_text(
+            f"SELECT item_id, ts_rank_cd(document, q) AS score FROM {SEARCH_PG_TABLE}, to_tsquery('simple', :q) q "
+            f"WHERE document @@ q ORDER BY score DESC, item_id DESC LIMIT :limit OFFSET :offset"
+        ), {'q': tsquery, 'limit': limit, 'offset': offset})
+        return [(item_id, float(score)) for item_id, score in rows]
+    # 无全文索引时退化为 LIKE 查询，按发布时间倒序
+    words = query_text.split()
+    query = db.session.query(RSSItem.id)
+    for word in words:
+        query = query.filter(or_(RSSItem.title.contains(word, autoescape=True),
+                                 RSSItem.summary.contains(word, autoescape=True)))
+    query = query.order_by(RSSItem.published_at.desc(), RSSItem.id.desc()).offset(offset).limit(limit)
+    return [(item_id, 0.0) for item_id, in query]
+
+def highlight_snippet(text: str, query_text: str, width: int = SEARCH_SNIPPET_CHARS) -> str:
+    """截取命中位置附近的文本，转义后用 <mark> 标出关键词。"""
+    text = text or ''
+    terms = [w for w in query_text.lower().split() if w]
+    lowered = text.lower()
+    if not any(t in lowered for t in terms):
+        # 整词未出现时按分词结果高亮（如中文查询只命中了部分二元组）
+        terms = [t for t in dict.fromkeys(_text_tokens(query_text, with_last_char=True)) if t in lowered]
+    positions = [lowered.find(t) for t in terms if t in lowered]
+    start = max(0, min(positions) - width // 3) if positions and len(text) > width else 0
+    snippet = text[start:start + width]
+    prefix = '...' if start > 0 else ''
+    suffix = '...' if start + width < len(text) else ''
+    if not terms:
+        return prefix + html.escape(snippet) + suffix
+    pattern = re.compile('|'.join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    parts = []
+    last = 0
+    for m in pattern.finditer(snippet):
+        parts.append(html.escape(snippet[last:m.start()]))
+        parts.append(f'<mark>{html.escape(m.group(0))}</mark>')
+        last = m.end()
+    parts.append(html.escape(snippet[last:]))
+    return prefix + ''.join(parts) + suffix
+
+def _store_feed_entries(feed_url: str, parsed, limit: int):
+    """将单个源解析结果批量写入数据库，返回新增文章的 id 列表。仅由写库步骤串行调用。
+
+    已存在的 guid/link 通过少量集合查询过滤，新行以多行插入写入；
+    并发写入造成的重复键由 ON CONFLICT DO NOTHING 吸收，不会回滚整个源。
+    与近期文章 SimHash 相近的条目不单独入库，而是作为别名合并到规范文章。
+    """
+    entries = list(getattr(parsed, 'entries', []))[:max(0, int(limit))]
+    source = parsed.feed.get('title', feed_url) if hasattr(parsed, 'feed') else feed_url
+
+    rows = []
+    batch_guids, batch_links = set(), set()
+    for entry in entries:
+        row = _entry_to_row(entry, source)
+        if not row:
+            continue
+        # 同一源内的重复条目只保留第一条
+        if row['guid'] in batch_guids or row['link'] in batch_links:
+            continue
+        batch_guids.add(row['guid'])
+        batch_links.add(row['link'])
+        rows.append(row)
+    if not rows:
+        return []
+
+    seen_guids, seen_links = _find_existing_keys(batch_guids, batch_links)
+    new_rows = [r for r in rows if r['guid'] not in seen_guids and r['link'] not in seen_links]
+    if not new_rows:
+        return []
+
+    try:
+        # 跨源近似重复的文章合并到已有的规范文章，只记录其链接
+        new_rows, merges = _merge_near_duplicates(new_rows)
+        _insert_rows(RSSItem.__table__, new_rows)
+        link_to_id = {}
+        for chunk in _chunked([r['link'] for r in new_rows]):
+            link_to_id.update((link, i) for i, link in db.session.query(RSSItem.id, RSSItem.link).filter(RSSItem.link.in_(chunk)))
+        new_ids = list(link_to_id.values())
+        index_items_for_search((link_to_id[r['link']], r['title'], r['summary'])
+                               for r in new_rows if r['link'] in link_to_id)
+        register_thumbnail_sources(r['image_url'] for r in new_rows)
+        if merges:
+            _store_aliases(merges)
+        bump_content_generation()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return new_ids
+
+def _enqueue_image_lookups(item_ids):
+    """新入库但没有封面的文章提前交给 og:image 补全队列，用户浏览前多半已补全。"""
+    for chunk in _chunked(item_ids):
+        rows = db.session.query(RSSItem.id, RSSItem.link).filter(RSSItem.id.in_(chunk), RSSItem.image_url.is_(None))
+        for item_id, link in rows:
+            image_enricher.enqueue(item_id, link)
+
+def _load_feed_states(feed_urls):
+    """读取（必要时创建）各源的 FeedState 记录，返回 url -> FeedState。"""
+    states = {st.url: st for st in FeedState.query.filter(FeedState.url.in_(list(feed_urls))).all()}
+    missing = [url for url in feed_urls if url not in states]
+    for url in missing:
+        states[url] = FeedState(url=url)
+        db.session.add(states[url])
+    if missing:
+        db.session.commit()
+    return states
+
+def _record_fetch_result(state: FeedState, res: dict, stored_ok: bool, added: int = 0):
+    """根据抓取结果更新校验器、命中统计、调度与健康状态；入库失败时保留旧校验器以便下轮重新下载。"""
+    succeeded = res['status'] in ('ok', 'not_modified', 'unchanged') and stored_ok
+    _update_feed_schedule(state, res, succeeded, added)
+    _update_feed_health(state, res, succeeded)
+    _update_mirror_stats(state, res)
+    state.requests_total = (state.requests_total or 0) + 1
+    if res['status'] == 'not_modified':
+        state.not_modified_total = (state.not_modified_total or 0) + 1
+        state.bytes_saved_total = (state.bytes_saved_total or 0) + (state.last_body_bytes or 0)
+    elif res['status'] == 'unchanged':
+        state.not_modified_total = (state.not_modified_total or 0) + 1
+    elif res['status'] == 'ok' and stored_ok:
+        state.validator_url = res['mirror']
+        state.etag = (res['etag'] or '')[:512] or None
+        state.last_modified = (res['last_modified'] or '')[:128] or None
+        state.content_hash = res['content_hash']
+        state.last_body_bytes = res['bytes']
+
+def _update_feed_schedule(state: FeedState, res: dict, succeeded: bool, added: int):
+    """计算下一次轮询时间。
+
+    成功时按估计的发布速率调整间隔（期望每次轮询拿到 FEED_TARGET_NEW_ITEMS 条新内容），
+    且不短于源声明的 ttl/sy:updatePeriod；失败时指数退避并加随机抖动，同时遵守 Retry-After。
+    """
+    now = datetime.utcnow()
+    previous_poll = state.last_success_at
+    state.last_polled_at = now
+    interval = state.poll_interval_seconds or FEED_MIN_INTERVAL_SECONDS
+
+    if succeeded:
+        state.consecutive_failures = 0
+        state.last_success_at = now
+        if res['parsed'] is not None:
+            state.hint_interval_seconds = _feed_hint_seconds(res['parsed'])
+        state.avg_new_items = 0.7 * (state.avg_new_items or 0.0) + 0.3 * added
+
+        observed_rate = None
+        if previous_poll:
+            elapsed = max(1.0, (now - previous_poll).total_seconds())
+            observed_rate = added / elapsed
+        elif res['parsed'] is not None:
+            observed_rate = _entries_publish_rate(res['parsed'])
+        if observed_rate is not None:
+            state.publish_rate = observed_rate if state.publish_rate is None else 0.7 * state.publish_rate + 0.3 * observed_rate
+
+        if state.publish_rate:
+            interval = FEED_TARGET_NEW_ITEMS / state.publish_rate
+        else:
+            interval = interval * 1.5
+        interval = min(max(interval, FEED_MIN_INTERVAL_SECONDS), FEED_MAX_INTERVAL_SECONDS)
+        if state.hint_interval_seconds:
+            interval = max(interval, min(state.hint_interval_seconds, FEED_MAX_INTERVAL_SECONDS))
+        state.poll_interval_seconds = int(interval)
+        delay = interval * random.uniform(0.9, 1.1)
+    else:
+        state.consecutive_failures = (state.consecutive_failures or 0) + 1
+        backoff = min(FEED_MAX_BACKOFF_SECONDS, interval * (2 ** min(state.consecutive_failures, 10)))
+        delay = random.uniform(backoff / 2, backoff)
+
+    if res.get('retry_after'):
+        delay = max(delay, res['retry_after'])
+    state.next_poll_at = now + timedelta(seconds=delay)
+
+def _mirror_stats(state: FeedState) -> dict:
+    try:
+        return json.loads(state.mirror_stats or '{}')
+    except ValueError:
+        return {}
+
+def _update_mirror_stats(state: FeedState, res: dict):
+    """按镜像维护耗时的指数滑动平均，失败计为一次读取超时，供下次竞速排序。"""
+    if len(FEED_MIRRORS.get(state.url, [])) <= 1:
+        return
+    stats = _mirror_stats(state)
+    penalty_ms = int((FEED_CONNECT_TIMEOUT + FEED_READ_TIMEOUT) * 1000)
+    for attempt in res['attempts']:
+        if attempt['elapsed_ms'] is None:
+            continue
+        ok = attempt['status'] in ('ok', 'not_modified', 'unchanged', 'cancelled')
+        sample = attempt['elapsed_ms'] if ok else penalty_ms
+        entry = stats.setdefault(attempt['mirror'], {'ewma_ms': sample, 'wins': 0, 'failures': 0})
+        entry['ewma_ms'] = int(0.7 * entry['ewma_ms'] + 0.3 * sample)
+        if attempt['status'] != 'cancelled' and not ok:
+            entry['failures'] += 1
+    if res.get('mirror') in stats and res['status'] in ('ok', 'not_modified', 'unchanged'):
+        stats[res['mirror']]['wins'] += 1
+    state.mirror_stats = json.dumps(stats)
+
+def _breaker_allows(state: FeedState, now: datetime) -> bool:
+    """熔断器是否允许本次抓取；冷却期结束的源转为半开，本次抓取即为探测。"""
+    if (state.breaker_state or 'closed') != 'open':
+        return True
+    if state.breaker_open_until and now < state.breaker_open_until:
+        return False
+    state.breaker_state = 'half_open'
+    return True
+
+def _update_feed_health(state: FeedState, res: dict, succeeded: bool):
+    """记录耗时、流量与错误，并驱动熔断器状态转换。"""
+    now = datetime.utcnow()
+    try:
+        samples = json.loads(state.latency_samples or '[]')
+    except ValueError:
+        samples = []
+    samples.append(res['elapsed_ms'])
+    state.latency_samples = json.dumps(samples[-FEED_HEALTH_SAMPLES:])
+    state.bytes_fetched_total = (state.bytes_fetched_total or 0) + (res['bytes'] or 0)
+
+    if succeeded:
+        if (state.breaker_state or 'closed') != 'closed':
+            print(f"RSS 源恢复，关闭熔断: {state.url}")
+        state.breaker_state = 'closed'
+        state.breaker_open_until = None
+        return
+
+    state.last_error = (res['error'] or res['status'])[:300]
+    state.last_error_at = now
+    failures = state.consecutive_failures or 0
+    if state.breaker_state == 'half_open' or failures >= FEED_BREAKER_FAILURE_THRESHOLD:
+        if state.breaker_state != 'half_open':
+            state.breaker_trips = (state.breaker_trips or 0) + 1
+            print(f"RSS 源连续失败 {failures} 次，熔断: {state.url}")
+        # 半开探测每失败一次，冷却时间翻倍
+        extra = max(0, failures - FEED_BREAKER_FAILURE_THRESHOLD)
+        cooldown = min(FEED_BREAKER_MAX_COOLDOWN_SECONDS, FEED_BREAKER_COOLDOWN_SECONDS * (2 ** min(extra, 10)))
+        state.breaker_state = 'open'
+        state.breaker_open_until = now + timedelta(seconds=cooldown)
+        state.next_poll_at = max(state.next_poll_at or now, state.breaker_open_until)
+
+class FeedScheduler:
+    """按下一次轮询时间排序的优先队列，每个源独立调度。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._due = {}
+
+    def schedule(self, url: str, due_at: datetime):
+        with self._lock:
+            due_at = due_at or datetime.utcnow()
+            self._due[url] = due_at
+            heapq.heappush(self._heap, (due_at, url))
+
+    def load(self, states):
+        for url, st in states.items():
+            self.schedule(url, st.next_poll_at)
+
+    def pop_due(self, now: datetime = None):
+        """取出所有已到期的源。"""
+        now = now or datetime.utcnow()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, url = heapq.heappop(self._heap)
+                # 跳过被重新调度覆盖的旧条目
+                if self._due.get(url) == due_at:
+                    del self._due[url]
+                    due.append(url)
+        return due
+
+    def seconds_until_next(self, default: float):
+        with self._lock:
+            if not self._due:
+                return default
+            next_due = min(self._due.values())
+        return max(0.0, (next_due - datetime.utcnow()).total_seconds())
+
+feed_scheduler = FeedScheduler()
+
+def fetch_and_store_rss(limit: int = FETCH_LIMIT, feed_urls=None):
+    """抓取 RSS 源并存储至数据库（幂等插入）。
+
+    抓取阶段并发执行，写库阶段在调用线程中串行执行；返回本轮每个源的耗时报告。
+    各源携带上次保存的 ETag/Last-Modified 发起条件请求，304 时不下载也不解析。
+    feed_urls 为空时抓取全部源；抓取后各源按自适应间隔重新进入调度队列。
+    处于熔断状态的源在冷却期内直接跳过，冷却结束后发出一次半开探测。
+    """
+    cycle_started = time.monotonic()
+    feed_urls = list(feed_urls) if feed_urls is not None else FEED_URLS
+    states = _load_feed_states(feed_urls)
+    now = datetime.utcnow()
+    fetchable = [url for url in feed_urls if _breaker_allows(states[url], now)]
+    validators_by_url = {
+        url: {
+            'etag': st.etag,
+            'last_modified': st.last_modified,
+            'content_hash': st.content_hash,
+            # 旧数据没有记录校验器所属镜像时视为主地址
+            'validator_url': st.validator_url or url,
+        }
+        for url, st in states.items()
+    }
+    mirror_stats_by_url = {url: _mirror_stats(st) for url, st in states.items()}
+    results = _fetch_feeds_concurrently(fetchable, validators_by_url, mirror_stats_by_url)
+
+    report = []
+    for url in feed_urls:
+        if url not in fetchable:
+            report.append({
+                'url': url,
+                'mirror': None,
+                'status': 'circuit_open',
+                'elapsed_ms': 0,
+                'bytes': 0,
+                'added': 0,
+                'error': None,
+            })
+    for res in results:
+        added = 0
+        stored_ok = res['parsed'] is None
+        if res['parsed'] is not None:
+            try:
+                new_ids = _store_feed_entries(res['url'], res['parsed'], limit)
+                added = len(new_ids)
+                stored_ok = True
+                _enqueue_image_lookups(new_ids)
+                news_events.publish_ids(new_ids)
+            except Exception as exc:
+                db.session.rollback()
+                res['status'] = 'error'
+                res['error'] = str(exc)[:300]
+        _record_fetch_result(states[res['url']], res, stored_ok, added)
+        # 每个源的状态单独提交：后续源入库失败回滚时，不会丢掉前面源已记录的校验器、计数与调度
         try:
             db.session.commit()
         except Exception:
             db.session.rollback()
+        report.append({
+            'url': res['url'],
+            'mirror': res['mirror'],
+            'status': res['status'],
+            'elapsed_ms': res['elapsed_ms'],
+            'bytes': res['bytes'],
+            'added': added,
+            'error': res['error'],
+        })
+
+    for url, st in states.items():
+        feed_scheduler.schedule(url, st.next_poll_at)
+
+    hits = sum(1 for r in report if r['status'] in ('not_modified', 'unchanged'))
+    finished_at = datetime.utcnow()
+    cycle_report = {
+        'finished_at': finished_at.isoformat(),
+        'elapsed_ms': int((time.monotonic() - cycle_started) * 1000),
+        'cache_hits': hits,
+        'cache_hit_rate': round(hits / len(report), 4) if report else 0.0,
+        'bytes_saved': sum(states[r['url']].last_body_bytes or 0 for r in report if r['status'] == 'not_modified'),
+        'feeds': report,
+    }
+    try:
+        db.session.merge(FetchReport(name='last', finished_at=finished_at,
+                                     report=json.dumps(cycle_report, ensure_ascii=False)))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"保存抓取报告失败: {e}")
+    for r in report:
+        via = f" 经由 {r['mirror']}" if r['mirror'] and r['mirror'] != r['url'] else ''
+        print(f"RSS 抓取 {r['url']}{via}: {r['status']} {r['elapsed_ms']}ms 新增 {r['added']}" + (f" ({r['error']})" if r['error'] else ''))
+    return cycle_report
 
 def _normalize_url(url_value: str, base: str = None):
     if not url_value:
@@ -211,12 +1464,138 @@ def extract_image_from_entry(entry, summary_html: str = None):
             pass
     # 3) 从 summary 中提取 <img src>
     if summary_html:
-        img_re = re.compile(r'<img[^>]+src=[\"\']([^\"\']+)[\"\']', re.IGNORECASE)
-        m = img_re.search(summary_html)
+        m = _IMG_SRC_RE.search(summary_html)
         if m:
             return m.group(1)
     return None
 
+_IMG_SRC_RE = re.compile(r'<img[^>]+src=[\"\']([^\"\']+)[\"\']', re.IGNORECASE)
+_URL_HINT_RE = re.compile(r'\b(Article URL|Comments URL)\s*:\s*\S+', re.IGNORECASE)
+EXCERPT_CHARS = 120
+
+_SANITIZE_ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'del', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'span',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'u', 'ul',
+}
+_SANITIZE_ALLOWED_ATTRS = {
+    'a': {'href', 'title'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+_SANITIZE_DROP_CONTENT = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template'}
+_SANITIZE_VOID_TAGS = {'br', 'hr', 'img'}
+
+class _SummarySanitizer(HTMLParser):
+    """白名单方式清洗摘要 HTML：去掉脚本、事件属性与非 http(s) 链接。"""
+
+    def __init__(self, base_url: str = None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.parts = []
+        self.drop_depth = 0
+
+    def _safe_url(self, value):
+        value = _normalize_url((value or '').strip(), base=self.base_url)
+        if not value:
+            return None
+        scheme = urlparse(value).scheme.lower()
+        return value if scheme in ('http', 'https', '') else None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SANITIZE_DROP_CONTENT:
+            self.drop_depth += 1
+            return
+        if self.drop_depth or tag not in _SANITIZE_ALLOWED_TAGS:
+            return
+        allowed = _SANITIZE_ALLOWED_ATTRS.get(tag, set())
+        out = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in ('href', 'src'):
+                value = self._safe_url(value)
+                if not value:
+                    continue
+            out.append(f' {name}="{html.escape(value, quote=True)}"')
+        if tag == 'a':
+            out.append(' target="_blank" rel="noopener noreferrer"')
+        self.parts.append(f"<{tag}{''.join(out)}>")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in _SANITIZE_DROP_CONTENT and self.drop_depth:
+            self.drop_depth -= 1
+
+    def handle_endtag(self, tag):
+        if tag in _SANITIZE_DROP_CONTENT:
+            self.drop_depth = max(0, self.drop_depth - 1)
+            return
+        if self.drop_depth or tag not in _SANITIZE_ALLOWED_TAGS or tag in _SANITIZE_VOID_TAGS:
+            return
+        self.parts.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        if not self.drop_depth:
+            self.parts.append(html.escape(data, quote=False))
+
+def sanitize_summary_html(summary_html: str, base_url: str = None) -> str:
+    if not summary_html:
+        return ''
+    parser = _SummarySanitizer(base_url)
+    try:
+        parser.feed(summary_html)
+        parser.close()
+    except Exception:
+        return html.escape(_html_to_text(summary_html))
+    return ''.join(parser.parts)
+
+def make_excerpt(summary_html: str, max_chars: int = EXCERPT_CHARS) -> str:
+    """摘要纯文本：去标签、去 URL 与“Article URL/Comments URL”提示行后截断。"""
+    text = _html_to_text(summary_html)
+    text = _URL_HINT_RE.sub('', text)
+    text = ' '.join(_URL_RE.sub('', text).split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + '...'
+
+def build_placeholder_thumbnail(title_value: str, source_value: str = None):
+    """本地生成的确定性占位图地址（同一标题总是同一张图）。"""
+    # 使用 title 或 source 作为种子，退化为 'news'
+    seed = (title_value or source_value or 'news').strip() or 'news'
+    return f"/thumb/ph-{hashlib.sha1(seed.encode('utf-8')).hexdigest()[:16]}"
+
+def thumbnail_key(image_url: str) -> str:
+    return hashlib.sha256(image_url.encode('utf-8')).hexdigest()[:40]
+
+def thumbnail_path(image_url: str) -> str:
+    return f"/thumb/{thumbnail_key(image_url)}"
+
+def register_thumbnail_sources(image_urls):
+    """登记缩略图 key 与原图地址的对应关系（重复登记忽略）。"""
+    rows = {thumbnail_key(u): u for u in image_urls if u and len(u) <= 1024}
+    if rows:
+        _insert_rows(ThumbnailSource.__table__, [{'key': k, 'url': u} for k, u in rows.items()])
+
+def process_item_content(title: str, summary: str, link: str, entry_image: str = None, source: str = None):
+    """入库时一次性完成的内容处理：封面图、缩略图、纯文本摘要与清洗后的摘要 HTML。
+
+    封面优先取摘要中的第一张图，其次取 entry 的媒体图片（与原列表接口的优先级一致）。
+    """
+    content_img = None
+    if summary:
+        m = _IMG_SRC_RE.search(summary)
+        if m:
+            content_img = _normalize_url(m.group(1).strip(), base=link)
+    image_url = content_img or _normalize_url(entry_image, base=link)
+    return {
+        'image_url': image_url,
+        'thumbnail_url': thumbnail_path(image_url) if image_url else build_placeholder_thumbnail(title, source),
+        'excerpt': make_excerpt(summary),
+        'summary_html': sanitize_summary_html(summary, base_url=link),
+    }
+
 def get_client_ip(req):
     ip = req.environ.get('HTTP_X_FORWARDED_FOR', req.remote_addr) or ''
     if ',' in ip:
@@ -224,33 +1603,341 @@ def get_client_ip(req):
     return ip
 
 
+# 文章页 og:image 抓取：共享连接池（按 host 复用 keep-alive 连接），只读取 <head> 且最多读取这么多字节
+OG_MAX_HEAD_BYTES = int(os.environ.get('OG_MAX_HEAD_BYTES', '262144'))
+_page_session = pyrequests.Session()
+_page_session.headers['User-Agent'] = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'
+_page_session.mount('http://', HTTPAdapter(pool_connections=32, pool_maxsize=max(4, OG_ENRICH_WORKERS)))
+_page_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=max(4, OG_ENRICH_WORKERS)))
+
+_META_TAG_RE = re.compile(r'<meta\b[^>]*>|</head\s*>', re.IGNORECASE)
+_ATTR_RE = re.compile(r'([a-zA-Z_:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+# 数值越小优先级越高：og 系列优先于 twitter 系列
+_OG_IMAGE_KEYS = {
+    'og:image': 0,
+    'og:image:url': 0,
+    'og:image:secure_url': 0,
+    'twitter:image': 1,
+    'twitter:image:src': 1,
+}
+
+def _scan_meta_image(tag: str):
+    """解析单个 <meta> 标签，命中 og:image/twitter:image 变体时返回 (优先级, 图片地址)。"""
+    attrs = {}
+    for name, v1, v2, v3 in _ATTR_RE.findall(tag):
+        attrs[name.lower()] = v1 or v2 or v3
+    key = (attrs.get('property') or attrs.get('name') or attrs.get('itemprop') or '').strip().lower()
+    rank = _OG_IMAGE_KEYS.get(key)
+    content = (attrs.get('content') or '').strip()
+    if rank is None or not content:
+        return None
+    return rank, html.unescape(content)
+
 def fetch_og_image_from_page(article_url: str, timeout_seconds: int = 4):
-    """从文章页面抓取 og:image/twitter:image 作为封面图。"""
+    """从文章页面抓取 og:image/twitter:image 作为封面图。
+
+    流式读取响应，一次扫描匹配所有变体，读到 </head> 或 OG_MAX_HEAD_BYTES 字节即停止，
+    找到 og:image 时立即返回。
+    """
     if not article_url:
         return None
+    best = None
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'
-        }
-        resp = pyrequests.get(article_url, headers=headers, timeout=timeout_seconds)
-        if resp.status_code != 200 or not resp.text:
-            return None
-        html = resp.text
-        # og:image / twitter:image
-        patterns = [
-            r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']',
-            r'<meta[^>]+name=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']',
-            r'<meta[^>]+name=["\']twitter:image["\'][^>]+content=["\']([^"\']+)["\']',
-            r'<meta[^>]+property=["\']og:image:url["\'][^>]+content=["\']([^"\']+)["\']',
-        ]
-        for pat in patterns:
-            m = re.search(pat, html, flags=re.IGNORECASE)
-            if m:
-                img = m.group(1).strip()
-                return _normalize_url(img, base=article_url)
+        with _page_session.get(article_url, timeout=timeout_seconds, stream=True) as resp:
+            if resp.status_code != 200:
+                return None
+            content_type = resp.headers.get('Content-Type', '')
+            if content_type and 'html' not in content_type.lower():
+                return None
+            decoder = codecs.getincrementaldecoder(resp.encoding or 'utf-8')(errors='replace')
+            buffer = ''
+            read_bytes = 0
+            for chunk in resp.iter_content(chunk_size=8192):
+                read_bytes += len(chunk)
+                buffer += decoder.decode(chunk)
+                # 末尾未闭合的标签留到下一块再扫描
+                cut = buffer.rfind('<')
+                if cut != -1 and buffer.find('>', cut) != -1:
+                    cut = len(buffer)
+                scan, buffer = (buffer[:cut], buffer[cut:]) if cut != -1 else (buffer, '')
+                for m in _META_TAG_RE.finditer(scan):
+                    tag = m.group(0)
+                    if tag[1] == '/':
+                        return _normalize_url(best[1], base=article_url) if best else None
+                    hit = _scan_meta_image(tag)
+                    if hit and (best is None or hit[0] < best[0]):
+                        best = hit
+                        if best[0] == 0:
+                            return _normalize_url(best[1], base=article_url)
+                if read_bytes >= OG_MAX_HEAD_BYTES:
+                    break
     except Exception:
         return None
-    return None
+    return _normalize_url(best[1], base=article_url) if best else None
+
+class ImageEnricher:
+    """og:image 补全队列：有界线程池异步抓取文章页封面并写回 image_url，按文章 id 去重进行中的任务。
+
+    抓取失败会记录 og_failed_at，在 OG_RETRY_AFTER_SECONDS 内不再入队（负缓存）。
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self._lock = threading.Lock()
+        self._inflight = set()
+        self._executor = None
+
+    def needs_lookup(self, item) -> bool:
+        if item.image_url:
+            return False
+        if item.og_failed_at and datetime.utcnow() - item.og_failed_at < timedelta(seconds=OG_RETRY_AFTER_SECONDS):
+            return False
+        return True
+
+    def enqueue(self, article_id: int, link: str) -> bool:
+        """提交补全任务；已在进行中或队列已满时返回 False。"""
+        if not link:
+            return False
+        with self._lock:
+            if article_id in self._inflight or len(self._inflight) >= self.max_pending:
+                return False
+            self._inflight.add(article_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='og-image')
+        self._executor.submit(self._run, article_id, link)
+        return True
+
+    def _run(self, article_id: int, link: str):
+        try:
+            page_img = fetch_og_image_from_page(link)
+            table = RSSItem.__table__
+            with app.app_context():
+                try:
+                    if page_img:
+                        register_thumbnail_sources([page_img])
+                        result = db.session.execute(
+                            table.update()
+                            .where(table.c.id == article_id)
+                            .where(table.c.image_url.is_(None))
+                            .values(image_url=page_img, thumbnail_url=thumbnail_path(page_img), og_failed_at=None)
+                        )
+                        if result.rowcount:
+                            bump_content_generation()
+                    else:
+                        db.session.execute(
+                            table.update().where(table.c.id == article_id).values(og_failed_at=datetime.utcnow())
+                        )
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+        finally:
+            with self._lock:
+                self._inflight.discard(article_id)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+image_enricher = ImageEnricher(OG_ENRICH_WORKERS, OG_ENRICH_MAX_PENDING)
+
+class ThumbnailCache:
+    """内容寻址的缩略图磁盘缓存。
+
+    blobs/ 下的文件以编码后内容的 sha256 命名（相同图片只存一份），keys/ 下记录 key -> 内容哈希；
+    命中时更新文件 mtime，总大小超过上限时按 mtime 淘汰最久未访问的文件（LRU）。
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = defaultdict(threading.Lock)
+        self._size = None
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'blobs', digest[:2], digest)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.root, 'keys', key[:2], key)
+
+    def key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks[key]
+
+    def get(self, key: str):
+        """返回 (文件路径, 内容哈希)，未命中时返回 None。"""
+        try:
+            with open(self._key_path(key)) as f:
+                digest = f.read().strip()
+            path = self._blob_path(digest)
+            os.utime(path)
+            return path, digest
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self._account(len(data))
+        key_path = self._key_path(key)
+        os.makedirs(os.path.dirname(key_path), exist_ok=True)
+        with open(key_path, 'w') as f:
+            f.write(digest)
+        return path, digest
+
+    def _scan(self):
+        files = []
+        for dirpath, _, names in os.walk(os.path.join(self.root, 'blobs')):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _account(self, added: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            # 淘汰到上限的 90%，避免每次写入都触发扫描
+            files = sorted(self._scan())
+            total = sum(size for _, size, _ in files)
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._size = total
+
+# 缩略图：磁盘缓存目录与容量上限、输出尺寸（新闻卡片 350x200 的两倍，适配高分屏）、原图大小上限
+THUMB_CACHE_DIR = os.environ.get('THUMB_CACHE_DIR', os.path.abspath(os.path.join('instance', 'thumbs')))
+THUMB_CACHE_MAX_BYTES = int(os.environ.get('THUMB_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+THUMB_SIZE = (700, 400)
+THUMB_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+THUMB_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# 原图下载失败后多久（秒）内直接返回占位图、不再重试
+THUMB_RETRY_AFTER_SECONDS = int(os.environ.get('THUMB_RETRY_AFTER_SECONDS', '3600'))
+
+thumbnail_cache = ThumbnailCache(THUMB_CACHE_DIR, THUMB_CACHE_MAX_BYTES)
+
+def _placeholder_svg(seed: str) -> str:
+    """根据种子生成确定性的渐变占位图（SVG，无需外部请求）。"""
+    digest = hashlib.sha1(seed.encode('utf-8')).digest()
+    hue1 = digest[0] * 360 // 256
+    hue2 = (hue1 + 40 + digest[1] % 80) % 360
+    angle = digest[2] % 4
+    x2, y2 = [('100%', '100%'), ('100%', '0%'), ('0%', '100%'), ('100%', '50%')][angle]
+    w, h = THUMB_SIZE
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}">'
+        f'<defs><linearGradient id="g" x1="0%" y1="0%" x2="{x2}" y2="{y2}">'
+        f'<stop offset="0%" stop-color="hsl({hue1},55%,72%)"/>'
+        f'<stop offset="100%" stop-color="hsl({hue2},60%,58%)"/>'
+        f'</linearGradient></defs><rect width="100%" height="100%" fill="url(#g)"/></svg>'
+    )
+
+def _placeholder_response(seed: str, cache_control: str = THUMB_CACHE_CONTROL):
+    resp = app.response_class(_placeholder_svg(seed), mimetype='image/svg+xml')
+    resp.headers['Cache-Control'] = cache_control
+    return resp
+
+def _render_thumbnail(data: bytes):
+    """按卡片尺寸居中裁剪缩放，优先编码为 WebP，不支持时退回 JPEG。返回 (字节, mimetype)。"""
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+        img = ImageOps.fit(img, THUMB_SIZE, method=Image.LANCZOS)
+        out = io.BytesIO()
+        try:
+            img.save(out, format='WEBP', quality=78, method=4)
+            return out.getvalue(), 'image/webp'
+        except Exception:
+            out = io.BytesIO()
+            img.convert('RGB').save(out, format='JPEG', quality=80, optimize=True, progressive=True)
+            return out.getvalue(), 'image/jpeg'
+
+def _thumbnail_failed_recently(source) -> bool:
+    return bool(source.failed_at and
+                datetime.utcnow() - source.failed_at < timedelta(seconds=THUMB_RETRY_AFTER_SECONDS))
+
+def _download_image(url: str):
+    with _page_session.get(url, timeout=(FEED_CONNECT_TIMEOUT, FEED_READ_TIMEOUT), stream=True) as resp:
+        if resp.status_code != 200:
+            return None
+        chunks, size = [], 0
+        for chunk in resp.iter_content(chunk_size=65536):
+            size += len(chunk)
+            if size > THUMB_MAX_SOURCE_BYTES:
+                return None
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+@app.route('/thumb/<key>')
+def thumbnail(key):
+    """缩略图代理：首次请求时下载原图、缩放并写入磁盘缓存，之后直接从缓存返回（永久缓存头）。
+
+    下载失败会记录 failed_at，在 THUMB_RETRY_AFTER_SECONDS 内直接返回占位图（负缓存）。
+    """
+    if key.startswith('ph-'):
+        return _placeholder_response(key)
+    if not re.fullmatch(r'[0-9a-f]{40}', key):
+        abort(404)
+
+    cached = thumbnail_cache.get(key)
+    if cached is None:
+        source = db.session.get(ThumbnailSource, key)
+        if source is None:
+            abort(404)
+        if Image is None:
+            # 未安装 Pillow 时直接跳转原图
+            return redirect(source.url)
+        placeholder_cache_control = f'public, max-age={THUMB_RETRY_AFTER_SECONDS}'
+        if _thumbnail_failed_recently(source):
+            return _placeholder_response(key, placeholder_cache_control)
+        with thumbnail_cache.key_lock(key):
+            cached = thumbnail_cache.get(key)
+            if cached is None:
+                # 等锁期间可能已有其他请求失败过，重新读取一次
+                db.session.refresh(source)
+                if _thumbnail_failed_recently(source):
+                    return _placeholder_response(key, placeholder_cache_control)
+                try:
+                    data = _download_image(source.url)
+                    rendered = _render_thumbnail(data) if data else None
+                except Exception:
+                    rendered = None
+                if rendered is None:
+                    # 原图不可用：记录失败时间并返回占位图，只短时间缓存，稍后重试
+                    source.failed_at = datetime.utcnow()
+                    db.session.commit()
+                    return _placeholder_response(key, placeholder_cache_control)
+                cached = thumbnail_cache.put(key, rendered[0])
+
+    path, digest = cached
+    with open(path, 'rb') as f:
+        head = f.read(12)
+    mimetype = 'image/webp' if head[8:12] == b'WEBP' else 'image/jpeg'
+    resp = send_file(path, mimetype=mimetype, etag=digest, max_age=31536000, conditional=True)
+    resp.headers['Cache-Control'] = THUMB_CACHE_CONTROL
+    return resp
 
 @app.route('/')
 def index():
@@ -310,18 +1997,200 @@ def _login_required_page():
 def _login_required_api():
     return 'user_id' in session
 
+# 管理接口白名单（逗号分隔的用户名）；未配置时所有登录用户可访问
+ADMIN_USERNAMES = {u.strip() for u in os.environ.get('ADMIN_USERNAMES', '').split(',') if u.strip()}
+
+def _admin_required_api():
+    if not _login_required_api():
+        return False
+    return not ADMIN_USERNAMES or session.get('username') in ADMIN_USERNAMES
+
 @app.route('/dashboard')
 def dashboard():
     if not _login_required_page():
         return redirect(url_for('index'))
+    visit_counter.hit()
     return render_template('dashboard.html', username=session['username'])
 
 @app.route('/news')
 def news():
     if not _login_required_page():
         return redirect(url_for('index'))
+    visit_counter.hit()
     return render_template('news.html', username=session['username'])
 
+# /api/news 响应缓存：条目上限与有效期（秒）；设置 NEWS_CACHE_URL（如 redis://localhost:6379/0）时多进程共享
+NEWS_CACHE_MAX_ENTRIES = int(os.environ.get('NEWS_CACHE_MAX_ENTRIES', '256'))
+NEWS_CACHE_TTL_SECONDS = int(os.environ.get('NEWS_CACHE_TTL_SECONDS', '60'))
+NEWS_CACHE_URL = os.environ.get('NEWS_CACHE_URL', '').strip()
+
+class MemoryCacheBackend:
+    """进程内缓存后端：按最近使用淘汰的有界字典，条目超过 TTL 视为未命中。"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class RedisCacheBackend:
+    """共享缓存后端（需要安装 redis），多个 Web 进程共用同一份页面缓存。"""
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = 'newsboard:'):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str):
+        try:
+            return self.client.get(self.prefix + key)
+        except Exception:
+            return None
+
+    def set(self, key: str, value: bytes):
+        try:
+            self.client.set(self.prefix + key, value, ex=self.ttl_seconds)
+        except Exception:
+            pass
+
+class ResponseCache:
+    """缓存序列化后的 JSON 响应体及其 ETag。键中带有内容版本号，入库后旧版本的条目自然失效。"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, key: str):
+        """返回 (etag, body)，未命中时返回 None。"""
+        value = self.backend.get(key)
+        if not value:
+            return None
+        etag, _, body = value.partition(b'\n')
+        return etag.decode('ascii'), body
+
+    def put(self, key: str, body: bytes) -> str:
+        etag = hashlib.sha1(body).hexdigest()
+        self.backend.set(key, etag.encode('ascii') + b'\n' + body)
+        return etag
+
+def _make_cache_backend(max_entries: int, ttl_seconds: int, prefix: str, label: str):
+    if NEWS_CACHE_URL:
+        if redis is not None:
+            return RedisCacheBackend(NEWS_CACHE_URL, ttl_seconds, prefix=prefix)
+        print(f"未安装 redis，{label} 响应缓存退回进程内缓存")
+    return MemoryCacheBackend(max_entries, ttl_seconds)
+
+news_cache = ResponseCache(_make_cache_backend(NEWS_CACHE_MAX_ENTRIES, NEWS_CACHE_TTL_SECONDS, 'newsboard:', '/api/news'))
+
+# 评论首屏缓存：按文章缓存第一页顶层评论，键中带该文章的评论版本号，发表评论后各进程同时失效
+# （与 /api/news 共用 NEWS_CACHE_URL）
+COMMENT_CACHE_MAX_ENTRIES = int(os.environ.get('COMMENT_CACHE_MAX_ENTRIES', '512'))
+COMMENT_CACHE_TTL_SECONDS = int(os.environ.get('COMMENT_CACHE_TTL_SECONDS', '300'))
+comment_cache = ResponseCache(_make_cache_backend(COMMENT_CACHE_MAX_ENTRIES, COMMENT_CACHE_TTL_SECONDS,
+                                                  'newsboard:comments:', '/api/comments'))
+
+# 列表默认只返回卡片需要的字段（excerpt 代替完整 summary，正文只通过详情页加载），
+# 其余字段可通过 fields= 显式请求
+NEWS_LIST_FIELDS = ('id', 'source', 'title', 'link', 'thumbnail_url', 'excerpt', 'published_at', 'view_count')
+NEWS_FIELDS = NEWS_LIST_FIELDS + ('guid', 'image_url', 'alternate_links')
+# 排序游标、占位图与 og:image 补全需要的列
+_NEWS_INTERNAL_COLUMNS = ('id', 'priority', 'published_at', 'title', 'source', 'link', 'image_url', 'thumbnail_url', 'og_failed_at')
+# 小于该字节数的响应不压缩
+GZIP_MIN_BYTES = 1024
+
+def _client_accepts_gzip() -> bool:
+    return request.accept_encodings.quality('gzip') > 0
+
+def _maybe_gzip(body: bytes, accepts_gzip: bool) -> bytes:
+    # mtime=0 保证相同内容压缩结果一致，ETag 在各进程间稳定
+    if accepts_gzip and len(body) >= GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+def _json_response(body: bytes, etag: str):
+    """带 ETag 的 JSON 响应；客户端 If-None-Match 命中时返回 304。body 可以是 gzip 压缩后的内容。"""
+    resp = app.response_class(body, mimetype='application/json')
+    if body[:2] == b'\x1f\x8b':  # gzip 魔数，JSON 不会以此开头
+        resp.headers['Content-Encoding'] = 'gzip'
+    resp.vary.add('Accept-Encoding')
+    resp.set_etag(etag)
+    # 需要登录才能访问，只允许浏览器私有缓存，并且每次都携带 ETag 重新验证
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp.make_conditional(request)
+
+def _news_columns(fields):
+    """列表查询只选取需要的列，不加载完整的 ORM 对象（尤其是可能很大的 summary/summary_html）。"""
+    return [getattr(RSSItem, name) for name in dict.fromkeys(list(fields) + list(_NEWS_INTERNAL_COLUMNS))]
+
+def _serialize_news_rows(rows, fields):
+    """把 _news_columns 查询结果转为列表项。"""
+    # 尚未回填 excerpt 的旧文章，单独查询其 summary 现算摘要
+    legacy_excerpts = {}
+    missing = [r.id for r in rows if 'excerpt' in fields and r.excerpt is None]
+    if missing:
+        legacy_excerpts = {
+            item_id: make_excerpt(summary or '')
+            for item_id, summary in db.session.query(RSSItem.id, RSSItem.summary).filter(RSSItem.id.in_(missing))
+        }
+    items = []
+    for r in rows:
+        d = {}
+        for name in fields:
+            value = getattr(r, name)
+            if name == 'published_at':
+                value = value.isoformat() if value else None
+            elif name == 'alternate_links':
+                value = json.loads(value) if value else []
+            elif name == 'thumbnail_url' and not value:
+                value = r.image_url or build_placeholder_thumbnail(r.title, r.source)
+            elif name == 'excerpt' and value is None:
+                value = legacy_excerpts.get(r.id, '')
+            d[name] = value
+        items.append(d)
+    return items
+
+# 列表排序方式及其排序列（均为倒序，与 ix_rss_item_feed_order / ix_rss_item_hot_order 索引一致）
+NEWS_SORT_KEYS = {
+    'default': ('priority', 'published_at', 'id'),
+    'hot': ('hot_score', 'id'),
+}
+_CURSOR_TYPES = {'priority': int, 'published_at': datetime.fromisoformat, 'hot_score': float, 'id': int,
+                 'created_at': datetime.fromisoformat}
+
+def _encode_cursor(keys, row) -> str:
+    """把最后一行的排序键编码为不透明的游标字符串。"""
+    values = [getattr(row, name) for name in keys]
+    payload = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decode_cursor(keys, raw: str):
+    try:
+        padded = raw + '=' * (-len(raw) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if len(values) != len(keys):
+            return None
+        return tuple(_CURSOR_TYPES[name](value) for name, value in zip(keys, values))
+    except Exception:
+        return None
+
 @app.route('/api/news')
 def api_news():
     if not _login_required_api():
@@ -332,123 +2201,782 @@ def api_news():
         limit = int(request.args.get('limit', 30))
     except ValueError:
         offset, limit = 0, 30
+    limit = max(1, min(limit, 100))
+    sort = request.args.get('sort') or 'default'
+    if sort not in NEWS_SORT_KEYS:
+        return jsonify({'success': False, 'message': f"不支持的排序方式: {sort}"}), 400
+    cursor_raw = request.args.get('cursor')
+    cursor = None
+    if cursor_raw:
+        cursor = _decode_cursor(NEWS_SORT_KEYS[sort], cursor_raw)
+        if cursor is None:
+            return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+    fields_raw = request.args.get('fields')
+    fields = list(NEWS_LIST_FIELDS)
+    if fields_raw:
+        fields = list(dict.fromkeys(f.strip() for f in fields_raw.split(',') if f.strip()))
+        unknown = [f for f in fields if f not in NEWS_FIELDS]
+        if unknown or not fields:
+            return jsonify({'success': False, 'message': f"不支持的字段: {', '.join(unknown)}"}), 400
 
-    # 放开域名限制；少数派优先，其次按发布时间倒序
-    sspai_like = f"%sspai.com%"
-    priority_expr = case(
-        (RSSItem.link.like(sspai_like), 1),
-        else_=0
-    )
-    # 进一步用 source 名称兜底提升优先级
-    priority_expr = case(
-        (RSSItem.source.like("%sspai%"), 1),
-        else_=priority_expr
-    )
-    query = RSSItem.query.order_by(priority_expr.desc(), RSSItem.published_at.desc())
+    accepts_gzip = _client_accepts_gzip()
+    page_key = f"c{cursor_raw}" if cursor_raw else f"o{offset}"
+    cache_key = (f"news:{current_content_generation()}:{sort}:{page_key}:{limit}:"
+                 f"{','.join(fields)}:{'gzip' if accepts_gzip else 'identity'}")
+    cached = news_cache.get(cache_key)
+    if cached is not None:
+        etag, body = cached
+        return _json_response(body, etag)
+
+    # 默认按入库时计算的来源优先级、发布时间倒序，sort=hot 按定期计算的热度分数；
+    # 两种顺序都由对应的复合索引直接提供
+    sort_columns = [getattr(RSSItem, name) for name in NEWS_SORT_KEYS[sort]]
+    query = (db.session.query(*_news_columns(fields + list(NEWS_SORT_KEYS[sort])))
+             .order_by(*[c.desc() for c in sort_columns]))
+    if cursor is not None:
+        # 游标分页：从上一页最后一条的排序键之后继续，不再跳过前面的行
+        query = query.filter(tuple_(*sort_columns) < tuple_(*cursor))
+    else:
+        # 兼容旧客户端的 offset 分页
+        query = query.offset(offset)
     # 优化：避免昂贵的 COUNT(*)，改为抓取 limit+1 判断 has_more
-    rows = query.offset(offset).limit(limit + 1).all()
+    rows = query.limit(limit + 1).all()
     has_more = len(rows) > limit
     items = rows[:limit]
+    next_cursor = None
+    if has_more and items:
+        last_item = items[-1]
+        next_cursor = _encode_cursor(NEWS_SORT_KEYS[sort], last_item)
 
-    def extract_image_from_html(html_text: str):
-        if not html_text:
-            return None
-        img_re = re.compile(r'<img[^>]+src=[\"\']([^\"\']+)[\"\']', re.IGNORECASE)
-        match = img_re.search(html_text)
-        return match.group(1) if match else None
-
-    def build_unsplash_url(title_value: str, source_value: str):
-        # 使用 title 或 source 作为查询关键词，退化为 'news'
-        base = 'news'
-        query = (title_value or source_value or base).strip() or base
-        # 控制长度，避免过长
-        query = query[:60]
-        return f"https://source.unsplash.com/featured/160x100/?{query}"
-
-    items_json = []
-    dirty = False
+    # 封面、缩略图与摘要均在入库时预处理，这里只读取已存字段；
+    # 无图文章交给后台补全 og:image，本次先返回占位图
     for i in items:
-        d = i.to_dict()
-        # 优先：内容第一张图；其次：存储的 image_url；最后：Unsplash 随机
-        content_img = extract_image_from_html(i.summary)
-        d['image_url'] = content_img or i.image_url
-        if not d['image_url']:
-            # 尝试抓取页面 og:image，并缓存回数据库
-            page_img = fetch_og_image_from_page(i.link)
-            if page_img:
-                i.image_url = page_img
-                d['image_url'] = page_img
-                dirty = True
-        d['thumbnail_url'] = d['image_url'] or build_unsplash_url(d.get('title'), d.get('source'))
-        items_json.append(d)
-
-    if dirty:
-        try:
-            db.session.commit()
-        except Exception:
-            db.session.rollback()
+        if image_enricher.needs_lookup(i):
+            image_enricher.enqueue(i.id, i.link)
+    items_json = _serialize_news_rows(items, fields)
 
-    return jsonify({
+    body = jsonify({
         'items': items_json,
         'total': None,
-        'has_more': has_more
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    }).get_data()
+    body = _maybe_gzip(body, accepts_gzip)
+    return _json_response(body, news_cache.put(cache_key, body))
+
+# 新文章推送（SSE）：心跳间隔、共享缓冲的条目数、单个连接最多补发的条目数（超过则通知客户端重新加载），
+# 以及检查其他进程（独立抓取器）写入的新文章的间隔（秒）
+STREAM_HEARTBEAT_SECONDS = int(os.environ.get('STREAM_HEARTBEAT_SECONDS', '15'))
+STREAM_BUFFER_SIZE = 500
+STREAM_CLIENT_BACKLOG = int(os.environ.get('STREAM_CLIENT_BACKLOG', '100'))
+STREAM_POLL_SECONDS = int(os.environ.get('STREAM_POLL_SECONDS', '10'))
+# 单个 SSE 响应的最长持续时间（秒），到时结束响应，由浏览器按 retry 间隔携带 Last-Event-ID 重连，
+# 避免同步 worker 被长连接一直占用
+STREAM_MAX_SECONDS = int(os.environ.get('STREAM_MAX_SECONDS', '30'))
+
+class NewsEventHub:
+    """新文章的进程内发布/订阅。
+
+    所有 SSE 连接共享一个按文章 id 递增的环形缓冲区和一个条件变量：发布时写入缓冲区并唤醒等待者，
+    每个连接只记录自己已发送到的 id，不为连接单独排队或开线程。事件 id 即文章 id，便于断线续传。
+    抓取器运行在其他进程时，由一个共享的后台线程定期按 id 查询新文章并发布。
+    """
+
+    def __init__(self, buffer_size: int, poll_seconds: int):
+        self.poll_seconds = poll_seconds
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=buffer_size)
+        self._evicted_through = 0  # 已被挤出缓冲区的最大 id
+        self.last_id = None
+        self._watcher = None
+
+    def publish(self, items):
+        """发布按 id 升序排列的列表项，已发布过的 id 会被忽略。"""
+        with self._cond:
+            for item in items:
+                if self.last_id is not None and item['id'] <= self.last_id:
+                    continue
+                if len(self._events) == self._events.maxlen:
+                    self._evicted_through = self._events[0][0]
+                self._events.append((item['id'], item))
+                self.last_id = item['id']
+            self._cond.notify_all()
+
+    def publish_ids(self, item_ids):
+        """在提交后按 id 读取新文章并发布；推送失败不影响入库。"""
+        if not item_ids:
+            return
+        try:
+            rows = (db.session.query(*_news_columns(NEWS_LIST_FIELDS))
+                    .filter(RSSItem.id.in_(list(item_ids)))
+                    .order_by(RSSItem.id)
+                    .all())
+            self.publish(_serialize_news_rows(rows, NEWS_LIST_FIELDS))
+        except Exception as e:
+            print(f"推送新文章失败: {e}")
+
+    def start(self):
+        """以数据库中当前最大的文章 id 为起点，并启动跨进程的新文章检查线程。"""
+        with self._cond:
+            if self._watcher is not None:
+                return
+            if self.last_id is None:
+                self.last_id = db.session.query(func.max(RSSItem.id)).scalar() or 0
+                self._evicted_through = self.last_id
+            self._watcher = threading.Thread(target=self._watch, name='news-stream-watch', daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            with app.app_context():
+                try:
+                    ids = [i for i, in db.session.query(RSSItem.id)
+                           .filter(RSSItem.id > self.last_id)
+                           .order_by(RSSItem.id)
+                           .limit(STREAM_BUFFER_SIZE)]
+                    self.publish_ids(ids)
+                except Exception:
+                    db.session.rollback()
+
+    def needs_backfill(self, cursor: int) -> bool:
+        """cursor 之后的文章是否可能已不在缓冲区中（需要查库补发）。"""
+        with self._cond:
+            return cursor < self._evicted_through
+
+    def events_after(self, cursor: int):
+        with self._cond:
+            if self.last_id is None or cursor >= self.last_id:
+                return []
+            return [item for event_id, item in self._events if event_id > cursor]
+
+    def wait(self, cursor: int, timeout: float) -> bool:
+        """等待 cursor 之后出现新事件；超时返回 False。"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.last_id is not None and self.last_id > cursor, timeout)
+
+news_events = NewsEventHub(STREAM_BUFFER_SIZE, STREAM_POLL_SECONDS)
+
+def _sse(event: str, data, event_id: int = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+@app.route('/api/stream')
+def api_stream():
+    """新文章推送（Server-Sent Events）。支持 Last-Event-ID 断线续传，空闲时定期发送心跳注释。"""
+    if not _login_required_api():
+        return jsonify({'authenticated': False}), 401
+
+    news_events.start()
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or -1)
+    except ValueError:
+        last_event_id = -1
+
+    cursor = news_events.last_id
+    initial = []
+    if last_event_id >= 0:
+        if news_events.needs_backfill(last_event_id):
+            # 断线期间的文章已不在缓冲区中，查库补发（超过上限则让客户端重新加载）
+            rows = (db.session.query(*_news_columns(NEWS_LIST_FIELDS))
+                    .filter(RSSItem.id > last_event_id, RSSItem.id <= cursor)
+                    .order_by(RSSItem.id)
+                    .limit(STREAM_CLIENT_BACKLOG + 1)
+                    .all())
+            initial = _serialize_news_rows(rows, NEWS_LIST_FIELDS)
+        else:
+            cursor = last_event_id
+    db.session.remove()
+
+    def generate(cursor, initial):
+        yield "retry: 5000\n\n"
+        pending = initial
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # 只带 id 的空事件不会触发 onmessage，但会更新浏览器的 Last-Event-ID，重连后从这里续传
+                yield f"id: {cursor}\n\n"
+                return
+            if len(pending) > STREAM_CLIENT_BACKLOG:
+                # 客户端落后太多，不再逐条补发
+                cursor = max(cursor, pending[-1]['id'])
+                yield _sse('reset', {'last_id': cursor}, cursor)
+            elif pending:
+                cursor = max(cursor, pending[-1]['id'])
+                yield _sse('items', pending, cursor)
+            elif not news_events.wait(cursor, min(STREAM_HEARTBEAT_SECONDS, remaining)):
+                yield ": ping\n\n"
+            if news_events.needs_backfill(cursor):
+                # 连接消费过慢，未发送的文章已被挤出缓冲区
+                cursor = news_events.last_id
+                yield _sse('reset', {'last_id': cursor}, cursor)
+            pending = news_events.events_after(cursor)
+
+    resp = Response(generate(cursor, initial), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # 关闭 nginx 代理缓冲
+    return resp
+
+@app.route('/api/search')
+def api_search():
+    """全文搜索：按相关度排序分页，返回带高亮的标题与摘要片段。"""
+    if not _login_required_api():
+        return jsonify({'authenticated': False}), 401
+
+    query_text = (request.args.get('q') or '').strip()
+    if not query_text:
+        return jsonify({'success': False, 'message': '请输入搜索关键词'}), 400
+    query_text = query_text[:100]
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        offset, limit = 0, 20
+    limit = max(1, min(limit, 50))
+
+    hits = search_item_ids(query_text, offset, limit + 1)
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    rows = {}
+    if hits:
+        rows = {r.id: r for r in db.session.query(
+            RSSItem.id, RSSItem.title, RSSItem.source, RSSItem.link, RSSItem.summary,
+            RSSItem.image_url, RSSItem.thumbnail_url, RSSItem.published_at
+        ).filter(RSSItem.id.in_([item_id for item_id, _ in hits]))}
+
+    items = []
+    for item_id, score in hits:
+        r = rows.get(item_id)
+        if r is None:
+            continue
+        items.append({
+            'id': r.id,
+            'title': r.title,
+            'title_html': highlight_snippet(r.title, query_text, width=len(r.title or '')),
+            'snippet_html': highlight_snippet(_html_to_text(r.summary), query_text),
+            'source': r.source,
+            'link': r.link,
+            'thumbnail_url': r.thumbnail_url or r.image_url or build_placeholder_thumbnail(r.title, r.source),
+            'published_at': r.published_at.isoformat() if r.published_at else None,
+            'score': round(score, 4),
+        })
+    return jsonify({
+        'items': items,
+        'has_more': has_more,
+        'next_offset': offset + limit if has_more else None
     })
 
+@app.route('/api/admin/feeds')
+def admin_feeds():
+    """各 RSS 源的抓取状态与最近一轮抓取报告"""
+    if not _admin_required_api():
+        return jsonify({'authenticated': False}), 401
+
+    # 调度与报告都从数据库读取：抓取器通常是独立进程，Web 进程内没有调度队列
+    states = FeedState.query.order_by(FeedState.url).all()
+    schedule = sorted((st for st in states if st.next_poll_at), key=lambda st: st.next_poll_at)
+    last = db.session.get(FetchReport, 'last')
+    return jsonify({
+        'feeds': [st.to_dict() for st in states],
+        'schedule': [{'url': st.url, 'next_due': st.next_poll_at.isoformat()} for st in schedule],
+        'last_fetch': json.loads(last.report) if last and last.report else None
+    })
+
+@app.route('/api/admin/feeds/health')
+def admin_feeds_health():
+    """各 RSS 源的健康状况与熔断状态，按 p90 耗时降序排列"""
+    if not _admin_required_api():
+        return jsonify({'authenticated': False}), 401
+
+    health = [st.health_dict() for st in FeedState.query.all()]
+    health.sort(key=lambda h: h['latency_ms']['p90'] or 0, reverse=True)
+    return jsonify({'feeds': health})
+
+# 网站访问量：页面访问在内存中累加，每隔多少秒写库一次
+VISIT_FLUSH_INTERVAL_SECONDS = float(os.environ.get('VISIT_FLUSH_INTERVAL_SECONDS', '10'))
+USER_INFO_MAX_AGE_SECONDS = 30
+
+class VisitCounter:
+    """网站总访问量的进程内累加器。
+
+    页面访问只增加内存中的增量，后台线程定期用一条原子的 UPDATE ... SET total_visits = total_visits + n
+    写回 site_stats，多个进程各自累加也不会丢失计数；读取时返回最近一次从库中读到的总数加上本进程未写入的增量。
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = 0
+        self._total = None
+        self._total_read_at = 0.0
+        self._thread = None
+
+    def hit(self, n: int = 1):
+        with self._lock:
+            self._pending += n
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='visit-flush', daemon=True)
+                self._thread.start()
+
+    def total(self) -> int:
+        # 总数超过一个写回间隔未从库中刷新时重新读取（其他进程的访问也会累加到库里）
+        self.flush()
+        with self._lock:
+            return (self._total or 0) + self._pending
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """写回累加的访问量并刷新总数；没有增量且总数在一个写回间隔内读取过时不访问数据库。"""
+        with self._flush_lock:
+            with self._lock:
+                fresh = self._total is not None and time.monotonic() - self._total_read_at < self.flush_interval
+                if not self._pending and fresh:
+                    return
+                delta = self._pending
+                self._pending = 0
+            with app.app_context():
+                try:
+                    table = SiteStats.__table__
+                    stats_id = db.session.query(func.min(table.c.id)).scalar()
+                    if stats_id is None:
+                        db.session.execute(table.insert().values(total_visits=delta, updated_at=datetime.utcnow()))
+                    elif delta:
+                        db.session.execute(
+                            table.update()
+                            .where(table.c.id == stats_id)
+                            .values(total_visits=func.coalesce(table.c.total_visits, 0) + delta,
+                                    updated_at=datetime.utcnow())
+                        )
+                    total = db.session.query(func.sum(table.c.total_visits)).scalar() or 0
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"写入访问量失败，稍后重试: {e}")
+                    with self._lock:
+                        self._pending += delta
+                    return
+            with self._lock:
+                self._total = total
+                self._total_read_at = time.monotonic()
+
+    def close(self):
+        """进程退出时写回剩余增量；没有页面访问的进程（抓取器、命令行）不访问数据库。"""
+        if self._pending:
+            self.flush()
+
+visit_counter = VisitCounter(VISIT_FLUSH_INTERVAL_SECONDS)
+atexit.register(visit_counter.close)
+
 @app.route('/api/user')
 def get_user():
+    """当前用户信息与网站总访问量（只读，可被浏览器短时间缓存）"""
     if not _login_required_api():
         return jsonify({'authenticated': False}), 401
     
-    user = User.query.get(session['user_id'])
-    # 更新网站总访问量
-    site_stats = SiteStats.query.first()
-    if not site_stats:
-        site_stats = SiteStats(total_visits=1)
-        db.session.add(site_stats)
-    else:
-        site_stats.total_visits += 1
-    db.session.commit()
+    user = db.session.get(User, session['user_id'])
+    if user is None:
+        return jsonify({'authenticated': False}), 401
 
-    return jsonify({
+    resp = jsonify({
         'authenticated': True,
         'username': user.username,
         'email': user.email,
         'created_at': user.created_at.isoformat(),
-        'site_total_visits': site_stats.total_visits
+        'site_total_visits': visit_counter.total()
     })
+    resp.headers['Cache-Control'] = f'private, max-age={USER_INFO_MAX_AGE_SECONDS}'
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+# 唯一访客计数方式：hll 为每篇文章保存一个 HyperLogLog 草图（相对误差约 VIEW_HLL_ERROR，几 KB 以内），
+# exact 为逐条记录 (文章, IP) 到 article_view 表（随文章数×访客数无限增长）
+VIEW_COUNT_MODE = os.environ.get('VIEW_COUNT_MODE', 'hll').strip().lower()
+VIEW_HLL_ERROR = float(os.environ.get('VIEW_HLL_ERROR', '0.02'))
+# 多个进程同时写回同一篇文章的草图时，条件更新失败后的最多重试轮数
+VIEW_SKETCH_MAX_RETRIES = 5
+
+class HyperLogLog:
+    """HyperLogLog 基数估计草图：2^p 个单字节寄存器，标准误差约 1.04/sqrt(2^p)。
+
+    序列化为 1 字节精度加寄存器数组再经 zlib 压缩，访客少时大部分寄存器为 0，压缩后只有几十字节。
+    """
+
+    MIN_PRECISION = 4
+    MAX_PRECISION = 16
+
+    def __init__(self, precision: int, registers: bytearray = None):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.m)
+
+    @classmethod
+    def precision_for_error(cls, error: float) -> int:
+        m = (1.04 / max(error, 1e-4)) ** 2
+        return min(cls.MAX_PRECISION, max(cls.MIN_PRECISION, math.ceil(math.log2(m))))
+
+    def add(self, value: str):
+        h = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        width = 64 - self.p
+        idx = h >> width
+        rho = width - (h & ((1 << width) - 1)).bit_length() + 1
+        if rho > self.registers[idx]:
+            self.registers[idx] = rho
+
+    def estimate(self) -> float:
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        total = sum(count * 2.0 ** -r for r, count in Counter(self.registers).items())
+        est = alpha * m * m / total
+        zeros = self.registers.count(0)
+        if est <= 2.5 * m and zeros:
+            # 小基数时用线性计数修正
+            est = m * math.log(m / zeros)
+        return est
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(bytes([self.p]) + bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        raw = zlib.decompress(data)
+        return cls(raw[0], bytearray(raw[1:]))
+
+def _article_sketch(blob) -> HyperLogLog:
+    if blob:
+        return HyperLogLog.from_bytes(blob)
+    return HyperLogLog(HyperLogLog.precision_for_error(VIEW_HLL_ERROR))
+
+# 浏览计数写回：同一 (文章, IP) 在窗口期内只记一次，定期批量写库；待写入条目数上限
+VIEW_DEDUPE_WINDOW_SECONDS = int(os.environ.get('VIEW_DEDUPE_WINDOW_SECONDS', '1800'))
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.environ.get('VIEW_FLUSH_INTERVAL_SECONDS', '5'))
+VIEW_MAX_PENDING = int(os.environ.get('VIEW_MAX_PENDING', '10000'))
+VIEW_COUNT_CACHE_SIZE = 10000
+
+class ViewAggregator:
+    """浏览记录的内存聚合与批量写回（write-behind）。
+
+    点击只在内存中登记 (article_id, ip)：窗口期内的重复点击直接忽略，新的记录进入有界的待写队列，
+    后台线程每 VIEW_FLUSH_INTERVAL_SECONDS 秒（或队列过半时）把它们合并进各文章的 HyperLogLog 草图
+    （exact 模式下写入 article_view），并按文章合并成批量 UPDATE view_count。
+    返回给客户端的计数为已知的库内计数加上未写入的增量。
+    进程退出时会把剩余记录写完。
+    """
+
+    def __init__(self, window_seconds: int, flush_interval: float, max_pending: int):
+        self.window_seconds = window_seconds
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._recent = OrderedDict()   # (article_id, ip) -> 登记时间（monotonic），用于窗口期去重
+        self._pending = {}             # (article_id, ip) -> viewed_at，等待写库
+        self._pending_by_article = Counter()
+        self._counts = OrderedDict()   # article_id -> 最近一次从库中读到的 view_count
+        self._thread = None
+        self.dropped = 0
+
+    def seed(self, article_id: int, view_count: int):
+        """记录从库中读到的计数，后续查询无需再读库。"""
+        with self._lock:
+            self._remember_count(article_id, view_count or 0)
+
+    def _remember_count(self, article_id: int, view_count: int):
+        self._counts[article_id] = view_count
+        self._counts.move_to_end(article_id)
+        while len(self._counts) > VIEW_COUNT_CACHE_SIZE:
+            self._counts.popitem(last=False)
+
+    def count(self, article_id: int):
+        """已知计数加上未写库的增量；计数未知时返回 None。"""
+        with self._lock:
+            base = self._counts.get(article_id)
+            if base is None:
+                return None
+            return base + self._pending_by_article[article_id]
+
+    def record(self, article_id: int, user_ip: str) -> bool:
+        """登记一次浏览，窗口期内重复或队列已满时返回 False。"""
+        now = time.monotonic()
+        key = (article_id, user_ip)
+        with self._lock:
+            while self._recent:
+                seen_at = next(iter(self._recent.values()))
+                if now - seen_at < self.window_seconds:
+                    break
+                self._recent.popitem(last=False)
+            if key in self._recent or key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                self._wake.set()
+                return False
+            self._recent[key] = now
+            self._pending[key] = datetime.utcnow()
+            self._pending_by_article[article_id] += 1
+            if len(self._pending) >= self.max_pending // 2:
+                self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-flush', daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """把待写记录写入数据库，返回实际新增的浏览数（已存在的 (文章, IP) 不重复计数）。"""
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+            if not pending:
+                return 0
+            with app.app_context():
+                try:
+                    inserted = self._write(pending)
+                    _write_view_rollups(pending)
+                    counts = {}
+                    for chunk in _chunked({article_id for article_id, _ in pending}):
+                        counts.update(db.session.query(RSSItem.id, RSSItem.view_count).filter(RSSItem.id.in_(chunk)))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"写入浏览记录失败，稍后重试: {e}")
+                    with self._lock:
+                        # 放回队列等待下次写入（仍受队列上限约束）
+                        for key, viewed_at in pending.items():
+                            if key in self._pending:
+                                self._pending_by_article[key[0]] -= 1
+                            elif len(self._pending) >= self.max_pending:
+                                self._pending_by_article[key[0]] -= 1
+                                self.dropped += 1
+                            else:
+                                self._pending[key] = viewed_at
+                    return 0
+            with self._lock:
+                for article_id, _ in pending:
+                    self._pending_by_article[article_id] -= 1
+                self._pending_by_article += Counter()  # 去掉计数为 0 的文章
+                for article_id, view_count in counts.items():
+                    self._remember_count(article_id, view_count or 0)
+            return sum(inserted.values())
+
+    def _write(self, pending) -> Counter:
+        if VIEW_COUNT_MODE == 'hll':
+            return self._write_sketches(pending)
+        return self._write_rows(pending)
+
+    def _write_sketches(self, pending) -> Counter:
+        """把 IP 并入各文章的草图，view_count 按估计值的增量递增，返回 article_id -> 新增数。
+
+        草图是读出、合并再写回的，SQLite 不支持 FOR UPDATE，所以写回用条件 UPDATE：
+        只有库中草图仍是读出时的内容才写入，被其他进程抢先写入的文章重新读取后再合并。
+        """
+        ips_by_article = defaultdict(list)
+        for article_id, ip in pending:
+            ips_by_article[article_id].append(ip)
+        items = RSSItem.__table__
+        increments = Counter()
+        remaining = list(ips_by_article)
+        for _ in range(VIEW_SKETCH_MAX_RETRIES):
+            conflicts = []
+            for chunk in _chunked(remaining):
+                rows = (db.session.query(RSSItem.id, RSSItem.view_sketch)
+                        .filter(RSSItem.id.in_(chunk))
+                        .with_for_update()
+                        .all())
+                for article_id, blob in rows:
+                    sketch = _article_sketch(blob)
+                    before = round(sketch.estimate())
+                    for ip in ips_by_article[article_id]:
+                        sketch.add(ip)
+                    added = max(0, round(sketch.estimate()) - before)
+                    unchanged = items.c.view_sketch.is_(None) if blob is None else items.c.view_sketch == blob
+                    result = db.session.execute(
+                        items.update()
+                        .where(items.c.id == article_id, unchanged)
+                        .values(view_sketch=sketch.to_bytes(),
+                                view_count=func.coalesce(items.c.view_count, 0) + added)
+                    )
+                    if result.rowcount == 0:
+                        conflicts.append(article_id)
+                    elif added:
+                        increments[article_id] = added
+            if not conflicts:
+                return increments
+            remaining = conflicts
+        # 由 flush 回滚并把本批访问放回队列，下次再写
+        raise RuntimeError(f"浏览草图并发更新冲突，{len(remaining)} 篇文章稍后重试")
+
+    def _write_rows(self, pending) -> Counter:
+        """插入浏览记录并按实际插入的行数递增 view_count，返回 article_id -> 新增数。"""
+        table = ArticleView.__table__
+        rows = [{'article_id': article_id, 'user_ip': ip, 'viewed_at': viewed_at}
+                for (article_id, ip), viewed_at in pending.items()]
+        inserted = Counter(article_id for article_id, in _insert_rows(table, rows, returning=('article_id',)))
+        if inserted:
+            items = RSSItem.__table__
+            db.session.execute(
+                items.update()
+                .where(items.c.id == bindparam('b_id'))
+                .values(view_count=func.coalesce(items.c.view_count, 0) + bindparam('b_n')),
+                [{'b_id': article_id, 'b_n': n} for article_id, n in inserted.items()]
+            )
+        return inserted
+
+# 浏览汇总：小时/天粒度的保留天数，以及 exact 模式下 article_view 逐条记录的保留天数（0 为永久保留）
+ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get('ROLLUP_HOURLY_RETENTION_DAYS', '14'))
+ROLLUP_DAILY_RETENTION_DAYS = int(os.environ.get('ROLLUP_DAILY_RETENTION_DAYS', '400'))
+VIEW_RAW_RETENTION_DAYS = int(os.environ.get('VIEW_RAW_RETENTION_DAYS', '90'))
+
+def _write_view_rollups(pending):
+    """把一批浏览记录累加到按小时/按天的文章与来源汇总表（与浏览记录同一事务）。"""
+    article_buckets = Counter()
+    for (article_id, _), viewed_at in pending.items():
+        hour = viewed_at.replace(minute=0, second=0, microsecond=0)
+        article_buckets[('hour', hour, article_id)] += 1
+        article_buckets[('day', hour.replace(hour=0), article_id)] += 1
+    sources = {}
+    for chunk in _chunked({article_id for article_id, _ in pending}):
+        sources.update(db.session.query(RSSItem.id, RSSItem.source).filter(RSSItem.id.in_(chunk)))
+    source_buckets = Counter()
+    for (granularity, bucket, article_id), views in article_buckets.items():
+        if article_id in sources:
+            source_buckets[(granularity, bucket, sources[article_id])] += views
+    _insert_rows(ArticleViewRollup.__table__, [
+        {'granularity': g, 'bucket': b, 'article_id': a, 'views': n}
+        for (g, b, a), n in article_buckets.items() if a in sources
+    ], increment='views', key_columns=('granularity', 'bucket', 'article_id'))
+    _insert_rows(SourceViewRollup.__table__, [
+        {'granularity': g, 'bucket': b, 'source': src, 'views': n}
+        for (g, b, src), n in source_buckets.items()
+    ], increment='views', key_columns=('granularity', 'bucket', 'source'))
+
+def prune_view_history(now: datetime = None) -> dict:
+    """删除超过保留期的小时/天汇总与 article_view 逐条记录，返回各表删除的行数。"""
+    now = now or datetime.utcnow()
+    deleted = {}
+    for model in (ArticleViewRollup, SourceViewRollup):
+        table = model.__table__
+        for granularity, days in (('hour', ROLLUP_HOURLY_RETENTION_DAYS), ('day', ROLLUP_DAILY_RETENTION_DAYS)):
+            result = db.session.execute(
+                table.delete()
+                .where(table.c.granularity == granularity)
+                .where(table.c.bucket < now - timedelta(days=days))
+            )
+            deleted[f"{table.name}.{granularity}"] = result.rowcount
+    if VIEW_RAW_RETENTION_DAYS > 0:
+        table = ArticleView.__table__
+        result = db.session.execute(
+            table.delete().where(table.c.viewed_at < now - timedelta(days=VIEW_RAW_RETENTION_DAYS))
+        )
+        deleted[table.name] = result.rowcount
+    db.session.commit()
+    return deleted
+
+view_aggregator = ViewAggregator(VIEW_DEDUPE_WINDOW_SECONDS, VIEW_FLUSH_INTERVAL_SECONDS, VIEW_MAX_PENDING)
+# 正常退出（包括 Ctrl+C 与 WSGI 服务器的平滑重启）时写完剩余的浏览记录
+atexit.register(view_aggregator.flush)
 
 @app.route('/api/view/<int:article_id>', methods=['POST'])
 def record_view(article_id):
     """记录资讯点击浏览"""
     if not _login_required_api():
         return jsonify({'success': False}), 401
-    
-    # 获取用户IP
-    user_ip = get_client_ip(request)
-    
-    # 检查是否已记录过该IP
-    existing_view = ArticleView.query.filter_by(
-        article_id=article_id,
-        user_ip=user_ip
-    ).first()
-    
-    if not existing_view:
-        # 记录新浏览
-        new_view = ArticleView(article_id=article_id, user_ip=user_ip)
-        db.session.add(new_view)
-        
-        # 更新资讯浏览计数
-        article = RSSItem.query.get(article_id)
-        if article:
-            article.view_count += 1
-        
-        db.session.commit()
-    
-    # 返回最新浏览数
-    article = RSSItem.query.get(article_id)
+
+    view_count = view_aggregator.count(article_id)
+    if view_count is None:
+        # 计数未知时读一次库（只读），之后由聚合器直接回答
+        row = db.session.query(RSSItem.view_count).filter(RSSItem.id == article_id).first()
+        if row is None:
+            return jsonify({'success': True, 'view_count': 0})
+        view_aggregator.seed(article_id, row.view_count)
+
+    # 浏览记录先在内存中去重聚合，由后台线程批量写库
+    view_aggregator.record(article_id, get_client_ip(request))
     return jsonify({
         'success': True,
-        'view_count': article.view_count if article else 0
+        'view_count': view_aggregator.count(article_id)
+    })
+
+@app.route('/api/trending')
+def api_trending():
+    """最近若干小时（默认24）浏览最多的文章，直接读取小时汇总表"""
+    if not _login_required_api():
+        return jsonify({'authenticated': False}), 401
+    try:
+        hours = int(request.args.get('hours', 24))
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        hours, limit = 24, 10
+    hours = max(1, min(hours, ROLLUP_HOURLY_RETENTION_DAYS * 24))
+    limit = max(1, min(limit, 50))
+
+    since = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    views = func.sum(ArticleViewRollup.views).label('views')
+    top = (db.session.query(ArticleViewRollup.article_id, views)
+           .filter(ArticleViewRollup.granularity == 'hour', ArticleViewRollup.bucket >= since)
+           .group_by(ArticleViewRollup.article_id)
+           .order_by(views.desc(), ArticleViewRollup.article_id.desc())
+           .limit(limit)
+           .all())
+    rows = {}
+    if top:
+        rows = {r.id: r for r in db.session.query(*_news_columns(NEWS_LIST_FIELDS))
+                .filter(RSSItem.id.in_([article_id for article_id, _ in top]))}
+    items = []
+    for article_id, n in top:
+        if article_id in rows:
+            item = _serialize_news_rows([rows[article_id]], NEWS_LIST_FIELDS)[0]
+            item['window_views'] = int(n)
+            items.append(item)
+    return jsonify({'hours': hours, 'items': items})
+
+@app.route('/api/admin/traffic/sources')
+def admin_source_traffic():
+    """各来源按小时或按天的浏览量序列，用于流量图表"""
+    if not _admin_required_api():
+        return jsonify({'authenticated': False}), 401
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('hour', 'day'):
+        return jsonify({'success': False, 'message': 'granularity 只能是 hour 或 day'}), 400
+    retention_days = ROLLUP_HOURLY_RETENTION_DAYS if granularity == 'hour' else ROLLUP_DAILY_RETENTION_DAYS
+    try:
+        days = int(request.args.get('days', 1 if granularity == 'hour' else 30))
+    except ValueError:
+        days = 30
+    days = max(1, min(days, retention_days))
+
+    since = datetime.utcnow() - timedelta(days=days)
+    query = (db.session.query(SourceViewRollup.source, SourceViewRollup.bucket, SourceViewRollup.views)
+             .filter(SourceViewRollup.granularity == granularity, SourceViewRollup.bucket >= since))
+    source = request.args.get('source')
+    if source:
+        query = query.filter(SourceViewRollup.source == source)
+    series = defaultdict(list)
+    totals = Counter()
+    for src, bucket, views in query.order_by(SourceViewRollup.bucket):
+        series[src].append({'bucket': bucket.isoformat(), 'views': views})
+        totals[src] += views
+    return jsonify({
+        'granularity': granularity,
+        'since': since.isoformat(),
+        'sources': [{'source': src, 'total': totals[src], 'series': series[src]}
+                    for src, _ in totals.most_common()]
     })
 
 @app.route('/article/<int:article_id>')
@@ -458,67 +2986,116 @@ def article_detail(article_id):
         return redirect(url_for('index'))
     
     article = RSSItem.query.get_or_404(article_id)
+    # 尚未回填的旧数据在此清洗，避免直接输出源站 HTML
+    if article.summary_html is None:
+        article.summary_html = sanitize_summary_html(article.summary, base_url=article.link)
     
-    # 记录浏览
-    user_ip = get_client_ip(request)
-    
-    existing_view = ArticleView.query.filter_by(
-        article_id=article_id,
-        user_ip=user_ip
-    ).first()
-    
-    if not existing_view:
-        new_view = ArticleView(article_id=article_id, user_ip=user_ip)
-        db.session.add(new_view)
-        article.view_count += 1
-        db.session.commit()
+    # 记录浏览（内存聚合，批量写库）
+    if view_aggregator.count(article.id) is None:
+        view_aggregator.seed(article.id, article.view_count)
+    view_aggregator.record(article.id, get_client_ip(request))
     
     return render_template('article_detail.html', 
                          article=article, 
+                         view_count=view_aggregator.count(article.id),
                          username=session.get('username'))
 
+# 评论按楼层分页：每次只取一页顶层评论并附带直接回复数，回复在展开时按需分页加载；
+# 两种查询都按 (article_id, parent_id, created_at, id) 索引顺序读取
+COMMENT_SORT_KEYS = ('created_at', 'id')
+COMMENT_PAGE_SIZE = 20
+
+def _comment_page(article_id: int, parent: 'Comment', cursor, limit: int):
+    """取 parent 的一页直接回复（parent 为 None 时取顶层评论），按时间倒序，返回 (列表项, 下一页游标)。"""
+    query = Comment.query.options(joinedload(Comment.user)).filter(Comment.article_id == article_id)
+    if parent is None:
+        query = query.filter(Comment.parent_id.is_(None))
+    else:
+        query = query.filter(Comment.parent_id == parent.id)
+    if cursor is not None:
+        query = query.filter(tuple_(Comment.created_at, Comment.id) < tuple_(*cursor))
+    rows = query.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1).all()
+    comments = rows[:limit]
+    next_cursor = _encode_cursor(COMMENT_SORT_KEYS, comments[-1]) if len(rows) > limit else None
+
+    reply_counts = {}
+    if comments:
+        reply_counts = dict(
+            db.session.query(Comment.parent_id, func.count(Comment.id))
+            .filter(Comment.article_id == article_id, Comment.parent_id.in_([c.id for c in comments]))
+            .group_by(Comment.parent_id)
+            .all()
+        )
+    items = []
+    for comment in comments:
+        data = comment.to_dict(parent=parent)
+        data['reply_count'] = reply_counts.get(comment.id, 0)
+        items.append(data)
+    return items, next_cursor
+
+def _comment_page_args():
+    """解析 cursor/limit 参数，游标无效时返回 None。"""
+    try:
+        limit = int(request.args.get('limit', COMMENT_PAGE_SIZE))
+    except ValueError:
+        limit = COMMENT_PAGE_SIZE
+    limit = max(1, min(limit, 100))
+    cursor_raw = request.args.get('cursor')
+    if not cursor_raw:
+        return None, limit
+    cursor = _decode_cursor(COMMENT_SORT_KEYS, cursor_raw)
+    return (cursor, limit) if cursor is not None else None
+
+def _comment_generation(article_id: int) -> str:
+    return f"comments:{article_id}"
+
 @app.route('/api/comments/<int:article_id>')
 def get_comments(article_id):
-    """获取文章的评论列表"""
+    """获取文章的顶层评论（游标分页），每条附带直接回复数"""
     if not _login_required_api():
         return jsonify({'authenticated': False}), 401
-    
-    comments = Comment.query.filter_by(article_id=article_id)\
-                           .order_by(Comment.created_at.desc())\
-                           .all()
 
-    if not comments:
-        return jsonify({'comments': [], 'total_count': 0})
+    page_args = _comment_page_args()
+    if page_args is None:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+    cursor, limit = page_args
 
-    comment_map = {comment.id: comment for comment in comments}
-    children_map: dict[int, list[Comment]] = defaultdict(list)
-    top_level: list[Comment] = []
+    # 首屏（无游标、默认页大小）按文章缓存，发表评论后失效；评论总数只在首屏统计
+    first_page = cursor is None and limit == COMMENT_PAGE_SIZE
+    cache_key = f"{article_id}:{current_content_generation(_comment_generation(article_id))}"
+    if first_page:
+        cached = comment_cache.get(cache_key)
+        if cached:
+            etag, body = cached
+            return _json_response(body, etag)
 
-    for comment in comments:
-        if comment.parent_id and comment.parent_id in comment_map:
-            children_map[comment.parent_id].append(comment)
-        else:
-            top_level.append(comment)
-
-    def serialize(item: Comment):
-        data = item.to_dict()
-        replies = children_map.get(item.id, [])
-        if replies:
-            replies.sort(key=lambda c: c.created_at or datetime.min, reverse=True)
-            data['replies'] = [serialize(child) for child in replies]
-        else:
-            data['replies'] = []
-        if item.parent_id and item.parent_id in comment_map:
-            parent_comment = comment_map[item.parent_id]
-            data['parent_username'] = parent_comment.user.username
-        return data
+    comments, next_cursor = _comment_page(article_id, None, cursor, limit)
+    payload = {'comments': comments, 'has_more': next_cursor is not None, 'next_cursor': next_cursor}
+    if cursor is None:
+        payload['total_count'] = Comment.query.filter_by(article_id=article_id).count()
+    body = jsonify(payload).get_data()
+    etag = comment_cache.put(cache_key, body) if first_page else hashlib.sha1(body).hexdigest()
+    return _json_response(body, etag)
 
-    top_level.sort(key=lambda c: c.created_at or datetime.min, reverse=True)
+@app.route('/api/comments/<int:article_id>/replies/<int:comment_id>')
+def get_comment_replies(article_id, comment_id):
+    """按需加载某条评论的直接回复（游标分页）"""
+    if not _login_required_api():
+        return jsonify({'authenticated': False}), 401
 
-    return jsonify({
-        'comments': [serialize(comment) for comment in top_level],
-        'total_count': len(comments)
-    })
+    page_args = _comment_page_args()
+    if page_args is None:
+        return jsonify({'success': False, 'message': '无效的分页游标'}), 400
+    cursor, limit = page_args
+
+    parent = Comment.query.options(joinedload(Comment.user))\
+                          .filter_by(id=comment_id, article_id=article_id)\
+                          .first()
+    if not parent:
+        return jsonify({'success': False, 'message': '评论不存在或已被删除'}), 404
+
+    comments, next_cursor = _comment_page(article_id, parent, cursor, limit)
+    return jsonify({'comments': comments, 'has_more': next_cursor is not None, 'next_cursor': next_cursor})
 
 @app.route('/api/comments/<int:article_id>', methods=['POST'])
 def add_comment(article_id):
@@ -556,59 +3133,326 @@ def add_comment(article_id):
     )
     
     db.session.add(comment)
+    bump_content_generation(_comment_generation(article_id))
     db.session.commit()
     db.session.refresh(comment)
     
+    data = comment.to_dict(parent=parent_comment)
+    data['reply_count'] = 0
     return jsonify({
         'success': True,
-        'comment': comment.to_dict()
+        'comment': data
     })
 
-if __name__ == '__main__':
-    with app.app_context():
-        # 确保 instance 目录存在（SQLite 默认路径）
+def _ensure_columns(table_name: str, columns: dict):
+    """为已存在的旧表补充缺失的列（create_all 不会修改已有表），返回本次新增的列名。"""
+    added = set()
+    try:
+        existing = {c['name'] for c in sa_inspect(db.engine).get_columns(table_name)}
+        with db.engine.begin() as conn:
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {name} {ddl}")
+                    added.add(name)
+    except Exception:
+        pass
+    return added
+
+def _ensure_indexes(table):
+    """为旧表补建模型中声明的索引（create_all 不会为已有表建索引）。"""
+    for index in table.indexes:
         try:
-            os.makedirs('instance', exist_ok=True)
+            index.create(db.engine, checkfirst=True)
         except Exception:
             pass
-        db.create_all()
-        # 尝试为旧表添加 image_url 和 view_count 字段（SQLite）
+
+def init_db():
+    """建表并为旧表补充后续新增的字段（Web 进程与独立抓取器共用）。"""
+    # 确保 instance 目录存在（SQLite 默认路径）
+    try:
+        os.makedirs('instance', exist_ok=True)
+    except Exception:
+        pass
+    db.create_all()
+    added = _ensure_columns(RSSItem.__table__.name, {
+        'image_url': 'VARCHAR(1024)',
+        'view_count': 'INTEGER DEFAULT 0',
+        'simhash': 'BIGINT',
+        'simhash_band0': 'INTEGER',
+        'simhash_band1': 'INTEGER',
+        'simhash_band2': 'INTEGER',
+        'simhash_band3': 'INTEGER',
+        'alternate_links': 'TEXT',
+        'thumbnail_url': 'VARCHAR(1024)',
+        'excerpt': 'VARCHAR(512)',
+        'summary_html': 'TEXT',
+        'og_failed_at': 'TIMESTAMP',
+        'priority': 'INTEGER NOT NULL DEFAULT 0',
+        'hot_score': 'FLOAT NOT NULL DEFAULT 0',
+        'view_sketch': 'BYTEA' if db.engine.dialect.name == 'postgresql' else 'BLOB',
+    })
+    _ensure_indexes(RSSItem.__table__)
+    _ensure_indexes(Comment.__table__)
+    if 'priority' in added:
+        # 新增的 priority 列按当前规则为旧数据计算一次
+        rerank_items()
+    if 'hot_score' in added:
+        update_hot_scores()
+    if ensure_search_index():
+        indexed = rebuild_search_index()
+        if indexed:
+            print(f"已为 {indexed} 篇文章建立搜索索引")
+    # 游标分页依赖 published_at 非空，旧数据用入库时间补齐
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(
+                RSSItem.__table__.update()
+                .where(RSSItem.__table__.c.published_at.is_(None))
+                .values(published_at=func.coalesce(RSSItem.__table__.c.created_at, func.current_timestamp()))
+            )
+    except Exception:
+        pass
+    _ensure_columns('comment', {
+        'parent_id': 'INTEGER REFERENCES comment(id)',
+    })
+    _ensure_columns(ThumbnailSource.__table__.name, {
+        'failed_at': 'TIMESTAMP',
+    })
+    _ensure_columns(FeedState.__table__.name, {
+        'poll_interval_seconds': 'INTEGER',
+        'next_poll_at': 'TIMESTAMP',
+        'last_polled_at': 'TIMESTAMP',
+        'last_success_at': 'TIMESTAMP',
+        'publish_rate': 'FLOAT',
+        'avg_new_items': 'FLOAT DEFAULT 0',
+        'hint_interval_seconds': 'INTEGER',
+        'consecutive_failures': 'INTEGER DEFAULT 0',
+        'last_error': 'VARCHAR(300)',
+        'last_error_at': 'TIMESTAMP',
+        'latency_samples': 'TEXT',
+        'bytes_fetched_total': 'BIGINT DEFAULT 0',
+        'breaker_state': "VARCHAR(16) DEFAULT 'closed'",
+        'breaker_open_until': 'TIMESTAMP',
+        'breaker_trips': 'INTEGER DEFAULT 0',
+        'validator_url': 'VARCHAR(1024)',
+        'mirror_stats': 'TEXT',
+    })
+
+# 抓取器租约时长（秒）；持有者每轮续约，超时未续约则由其他抓取器接管
+FETCHER_LEASE_NAME = 'rss-fetcher'
+FETCHER_LEASE_SECONDS = int(os.environ.get('FETCHER_LEASE_SECONDS', '120'))
+
+def fetcher_owner_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def acquire_fetcher_lease(owner: str) -> bool:
+    """获取或续约抓取器租约：单条条件 UPDATE 保证原子性，行不存在时插入。"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=FETCHER_LEASE_SECONDS)
+    table = FetcherLease.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.name == FETCHER_LEASE_NAME)
+        .where(or_(table.c.owner == owner, table.c.expires_at.is_(None), table.c.expires_at < now))
+        .values(owner=owner, expires_at=expires_at)
+    )
+    if result.rowcount == 0:
+        if db.session.get(FetcherLease, FETCHER_LEASE_NAME) is not None:
+            db.session.rollback()
+            return False
         try:
-            table_name = RSSItem.__table__.name
-            with db.engine.begin() as conn:
-                cols = [r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({table_name})").fetchall()]
-                if 'image_url' not in cols:
-                    conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN image_url VARCHAR(1024)")
-                if 'view_count' not in cols:
-                    conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN view_count INTEGER DEFAULT 0")
-        except Exception:
-            pass
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(name=FETCHER_LEASE_NAME, owner=owner, expires_at=expires_at))
+        except IntegrityError:
+            db.session.rollback()
+            return False
+    db.session.commit()
+    return True
 
+def release_fetcher_lease(owner: str):
+    table = FetcherLease.__table__
+    try:
+        db.session.execute(
+            table.update()
+            .where(table.c.name == FETCHER_LEASE_NAME)
+            .where(table.c.owner == owner)
+            .values(expires_at=None, owner=None)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+# 定期维护任务的间隔（秒），由持有租约的抓取器执行，避免多个进程重复执行
+MAINTENANCE_INTERVAL_SECONDS = int(os.environ.get('MAINTENANCE_INTERVAL_SECONDS', '3600'))
+HOT_RANK_INTERVAL_SECONDS = int(os.environ.get('HOT_RANK_INTERVAL_SECONDS', '300'))
+_maintenance_last_run = {}
+
+def _maintenance_due(task: str, interval: int, force: bool) -> bool:
+    now = time.monotonic()
+    last = _maintenance_last_run.get(task)
+    if not force and last is not None and now - last < interval:
+        return False
+    _maintenance_last_run[task] = now
+    return True
+
+def run_maintenance(force: bool = False):
+    """到期时执行定期维护：重算热度分数，清理过期的浏览汇总与逐条浏览记录。"""
+    if _maintenance_due('hot_rank', HOT_RANK_INTERVAL_SECONDS, force):
         try:
-            with db.engine.begin() as conn:
-                cols = [r[1] for r in conn.exec_driver_sql("PRAGMA table_info(comment)").fetchall()]
-                if 'parent_id' not in cols:
-                    conn.exec_driver_sql("ALTER TABLE comment ADD COLUMN parent_id INTEGER REFERENCES comment(id)")
-        except Exception:
-            pass
-        # 可通过环境变量关闭抓取器（如本地开发/测试）
-        if os.environ.get('DISABLE_FETCHER', '').lower() not in ('1', 'true', 'yes'):
-            # 启动前先抓取一次
+            update_hot_scores()
+        except Exception as e:
+            db.session.rollback()
+            print(f"重算热度分数失败: {e}")
+    if _maintenance_due('prune', MAINTENANCE_INTERVAL_SECONDS, force):
+        try:
+            deleted = prune_view_history()
+            if any(deleted.values()):
+                print(f"清理过期浏览数据: {deleted}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"清理过期浏览数据失败: {e}")
+
+def run_fetcher_loop(stop_event: threading.Event = None, owner: str = None):
+    """抓取器主循环：持有租约时按调度抓取到期的源，否则待机并定期尝试接管。"""
+    stop_event = stop_event or threading.Event()
+    owner = owner or fetcher_owner_id()
+    is_leader = False
+    while not stop_event.is_set():
+        with app.app_context():
             try:
-                fetch_and_store_rss(FETCH_LIMIT)
+                leader_now = acquire_fetcher_lease(owner)
             except Exception:
-                pass
-            # 启动后台抓取线程（默认每60秒一次，可通过环境变量调整）
-            def background_fetch_loop():
-                while True:
-                    try:
-                        fetch_and_store_rss(FETCH_LIMIT)
-                    except Exception:
-                        pass
-                    time.sleep(FETCH_INTERVAL_SECONDS)
-
-            t = threading.Thread(target=background_fetch_loop, daemon=True)
-            t.start()
+                db.session.rollback()
+                leader_now = False
+            if leader_now and not is_leader:
+                print(f"抓取器 {owner} 获得租约，开始抓取")
+                # 按数据库中保存的下次轮询时间恢复调度队列
+                feed_scheduler.load(_load_feed_states(FEED_URLS))
+            elif is_leader and not leader_now:
+                print(f"抓取器 {owner} 失去租约，转为待机")
+            is_leader = leader_now
+
+            if is_leader:
+                run_maintenance()
+                due = feed_scheduler.pop_due()
+                try:
+                    if due:
+                        fetch_and_store_rss(FETCH_LIMIT, feed_urls=due)
+                except Exception:
+                    db.session.rollback()
+                    retry_at = datetime.utcnow() + timedelta(seconds=FETCH_INTERVAL_SECONDS)
+                    for url in due:
+                        feed_scheduler.schedule(url, retry_at)
+        # 睡眠时间不超过租约的三分之一，保证按时续约
+        max_sleep = min(FETCH_INTERVAL_SECONDS, FETCHER_LEASE_SECONDS / 3)
+        sleep_seconds = feed_scheduler.seconds_until_next(max_sleep) if is_leader else max_sleep
+        stop_event.wait(min(max_sleep, max(1.0, sleep_seconds)))
+    with app.app_context():
+        release_fetcher_lease(owner)
+
+@app.cli.command('backfill-items')
+@click.option('--batch-size', default=500, show_default=True, help='每批处理的文章数')
+def backfill_items_command(batch_size):
+    """为旧文章回填入库预处理字段（封面、缩略图、摘要、清洗后的 HTML）与近似去重指纹。
+
+    只挑 excerpt 为空的行：处理后 excerpt 总是字符串，重复执行不会再次处理；
+    正文过短、算不出指纹的文章 simhash 保持为空，但不会因此每次都被重新回填。
+    """
+    last_id = 0
+    total = 0
+    while True:
+        batch = (RSSItem.query
+                 .filter(RSSItem.id > last_id)
+                 .filter(RSSItem.excerpt.is_(None))
+                 .order_by(RSSItem.id)
+                 .limit(batch_size)
+                 .all())
+        if not batch:
+            break
+        for item in batch:
+            processed = process_item_content(item.title, item.summary, item.link, item.image_url, item.source)
+            for key, value in processed.items():
+                setattr(item, key, value)
+            register_thumbnail_sources([item.image_url])
+            fp = _item_fingerprint(item.title, item.summary)
+            if fp is not None:
+                item.simhash = _to_signed64(fp)
+                (item.simhash_band0, item.simhash_band1,
+                 item.simhash_band2, item.simhash_band3) = _simhash_bands(fp)
+        bump_content_generation()
+        db.session.commit()
+        last_id = batch[-1].id
+        total += len(batch)
+        click.echo(f"已回填 {total} 篇（至 id={last_id}）")
+    click.echo(f"回填完成，共 {total} 篇")
+
+@app.cli.command('migrate-article-views')
+@click.option('--batch-size', default=200, show_default=True, help='每批处理的文章数')
+def migrate_article_views_command(batch_size):
+    """把 article_view 中逐条保存的浏览记录折叠进各文章的 HyperLogLog 草图，然后删除这些记录。
+
+    view_count 已是这些记录的精确计数，保持不变；之后的新访客按草图估计值的增量累加。
+    """
+    articles = 0
+    rows_total = 0
+    while True:
+        article_ids = [a for a, in db.session.query(ArticleView.article_id)
+                       .distinct()
+                       .order_by(ArticleView.article_id)
+                       .limit(batch_size)]
+        if not article_ids:
+            break
+        ips_by_article = defaultdict(list)
+        for article_id, ip in db.session.query(ArticleView.article_id, ArticleView.user_ip).filter(
+                ArticleView.article_id.in_(article_ids)):
+            ips_by_article[article_id].append(ip)
+        sketches = dict(db.session.query(RSSItem.id, RSSItem.view_sketch).filter(RSSItem.id.in_(article_ids)))
+        for article_id, ips in ips_by_article.items():
+            if article_id not in sketches:
+                continue  # 文章已不存在，只删除记录
+            sketch = _article_sketch(sketches[article_id])
+            for ip in ips:
+                sketch.add(ip)
+            db.session.execute(
+                RSSItem.__table__.update()
+                .where(RSSItem.__table__.c.id == article_id)
+                .values(view_sketch=sketch.to_bytes())
+            )
+        db.session.execute(ArticleView.__table__.delete().where(ArticleView.__table__.c.article_id.in_(article_ids)))
+        db.session.commit()
+        articles += len(article_ids)
+        rows_total += sum(len(ips) for ips in ips_by_article.values())
+        click.echo(f"已折叠 {articles} 篇文章的 {rows_total} 条浏览记录")
+    click.echo(f"迁移完成，共 {articles} 篇文章、{rows_total} 条浏览记录")
+
+@app.cli.command('reindex-search')
+@click.option('--batch-size', default=500, show_default=True, help='每批处理的文章数')
+def reindex_search_command(batch_size):
+    """重建全部文章的全文搜索索引。"""
+    ensure_search_index()
+    total = rebuild_search_index(batch_size)
+    click.echo(f"搜索索引重建完成，共 {total} 篇")
+
+@app.cli.command('rank-hot')
+def rank_hot_command():
+    """立即重算热度分数（抓取器会每 HOT_RANK_INTERVAL_SECONDS 秒自动执行）。"""
+    click.echo(f"已重算 {update_hot_scores()} 篇文章的热度分数")
+
+@app.cli.command('rerank-items')
+@click.option('--batch-size', default=5000, show_default=True, help='每批 UPDATE 覆盖的 id 区间大小')
+def rerank_items_command(batch_size):
+    """修改 RSS_PRIORITY_RULES 后按新规则重算所有文章的排序优先级。"""
+    changed = rerank_items(batch_size)
+    click.echo(f"重算完成，{changed} 篇文章的优先级发生变化")
+
+if __name__ == '__main__':
+    with app.app_context():
+        init_db()
+    # 开发模式下在进程内运行抓取器；生产环境请用 `python -m fetcher` 单独运行，
+    # 两者通过数据库租约互斥，可通过环境变量关闭（如本地开发/测试）
+    if os.environ.get('DISABLE_FETCHER', '').lower() not in ('1', 'true', 'yes'):
+        t = threading.Thread(target=run_fetcher_loop, daemon=True)
+        t.start()
     # 禁用调试与重载以便后台运行稳定
     port = int(os.environ.get('PORT', '8088'))
     app.run(debug=False, use_reloader=False, host='0.0.0.0', port=port)
@@ -7,6 +7,7 @@ import re
 import feedparser
 import threading
 import requests as pyrequests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
@@ -22,14 +23,25 @@ SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBhYmFzZSIsInJ
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-# RSS 源配置
-DEFAULT_FEEDS = 'https://sspai.com/feed,https://rsshub.app/sspai/index?limit=100,https://rsshub.nodejs.cn/sspai/index?limit=100,https://rsshub.rssforever.com/sspai/index?limit=100'
-FEED_URLS = [u.strip() for u in os.environ.get('RSS_FEED_URLS', DEFAULT_FEEDS).split(',') if u.strip()]
+# RSS 源配置：逗号分隔不同的源，同一源的多个镜像用 | 分隔（与 app.py 一致）
+DEFAULT_FEEDS = 'https://sspai.com/feed|https://rsshub.app/sspai/index?limit=100|https://rsshub.nodejs.cn/sspai/index?limit=100|https://rsshub.rssforever.com/sspai/index?limit=100'
+FEED_GROUPS = [
+    [u.strip() for u in group.split('|') if u.strip()]
+    for group in os.environ.get('RSS_FEED_URLS', DEFAULT_FEEDS).split(',')
+]
+FEED_GROUPS = [group for group in FEED_GROUPS if group]
 
 # 抓取条数与间隔
 FETCH_LIMIT = int(os.environ.get('RSS_FETCH_LIMIT', '1000'))
 FETCH_INTERVAL_SECONDS = int(os.environ.get('RSS_FETCH_INTERVAL_SECONDS', '300'))
 
+# 镜像竞速（与 app.py 相同的错峰策略）：单个镜像的总超时（秒）、首个镜像未返回时启动下一个的间隔
+FEED_TIMEOUT_SECONDS = float(os.environ.get('RSS_FEED_TIMEOUT_SECONDS', '15'))
+FEED_MIRROR_STAGGER_SECONDS = float(os.environ.get('RSS_FEED_MIRROR_STAGGER_SECONDS', '1.5'))
+FEED_USER_AGENT = 'Mozilla/5.0 (compatible; NewsBoard RSS Fetcher)'
+_mirror_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='rss-mirror')
+_mirror_latency_ms = {}  # 镜像 -> 最近耗时的滑动平均（进程内），用于决定先请求哪个镜像
+
 def _parse_struct_time_to_datetime(struct_time_value):
     if not struct_time_value:
         return None
@@ -39,12 +51,74 @@ def _parse_struct_time_to_datetime(struct_time_value):
     except Exception:
         return None
 
+def _fetch_mirror(url: str, cancel_event: threading.Event):
+    """下载并解析单个镜像，超时、出错、没有条目或竞速已有结果时返回 None。"""
+    started = time.monotonic()
+    parsed = None
+    try:
+        with pyrequests.get(url, headers={'User-Agent': FEED_USER_AGENT},
+                            timeout=(5, FEED_TIMEOUT_SECONDS), stream=True) as resp:
+            resp.raise_for_status()
+            chunks = []
+            for chunk in resp.iter_content(chunk_size=16384):
+                if cancel_event.is_set():
+                    return None
+                if time.monotonic() - started > FEED_TIMEOUT_SECONDS:
+                    raise TimeoutError('feed deadline exceeded')
+                chunks.append(chunk)
+            parsed = feedparser.parse(b''.join(chunks), response_headers=dict(resp.headers))
+    except Exception:
+        parsed = None
+    if cancel_event.is_set():
+        return None
+    ok = bool(getattr(parsed, 'entries', None))
+    # 失败按超时计，下次排到后面
+    _record_mirror_latency(url, (time.monotonic() - started) * 1000 if ok else FEED_TIMEOUT_SECONDS * 1000)
+    return parsed if ok else None
+
+def _record_mirror_latency(url: str, elapsed_ms: float):
+    previous = _mirror_latency_ms.get(url)
+    _mirror_latency_ms[url] = elapsed_ms if previous is None else previous * 0.7 + elapsed_ms * 0.3
+
+def _fetch_feed_group(mirrors):
+    """对同一源的多个镜像错峰竞速：先请求最近最快的镜像，超过 FEED_MIRROR_STAGGER_SECONDS
+    未返回或失败时再启动下一个，取第一个有效结果并取消其余请求。返回 (parsed, 镜像地址)。"""
+    order = [url for _, url in sorted(enumerate(mirrors), key=lambda item: (_mirror_latency_ms.get(item[1], 0), item[0]))]
+    cancel_event = threading.Event()
+    deadline = time.monotonic() + FEED_TIMEOUT_SECONDS + FEED_MIRROR_STAGGER_SECONDS * (len(order) - 1)
+    pending = {}
+    launched_at = {}
+    next_index = 0
+    try:
+        while True:
+            if next_index < len(order):
+                url = order[next_index]
+                next_index += 1
+                launched_at[url] = time.monotonic()
+                pending[_mirror_executor.submit(_fetch_mirror, url, cancel_event)] = url
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                return None, None
+            timeout = min(FEED_MIRROR_STAGGER_SECONDS, remaining) if next_index < len(order) else remaining
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                url = pending.pop(future)
+                parsed = future.result()
+                if parsed is not None:
+                    return parsed, url
+    finally:
+        cancel_event.set()
+        # 被取消的镜像耗时至少为已等待的时间，下次排在胜出镜像之后
+        now = time.monotonic()
+        for url in pending.values():
+            _record_mirror_latency(url, (now - launched_at[url]) * 1000)
+
 def fetch_and_store_rss(limit: int = FETCH_LIMIT):
-    """抓取 RSS 源并存储至 Supabase 数据库"""
-    for feed_url in FEED_URLS:
-        try:
-            parsed = feedparser.parse(feed_url)
-        except Exception:
+    """抓取 RSS 源并存储至 Supabase 数据库（每个源只使用镜像竞速中第一个返回有效内容的镜像）"""
+    for mirrors in FEED_GROUPS:
+        parsed, feed_url = _fetch_feed_group(mirrors)
+        if parsed is None:
+            print(f"RSS 抓取失败（全部镜像无有效内容）: {mirrors[0]}")
             continue
 
         entries = list(getattr(parsed, 'entries', []))[:max(0, int(limit))]
@@ -182,16 +256,26 @@ def logout():
     session.clear()
     return redirect(url_for('index'))
 
+def record_site_visit():
+    """网站访问量 +1：调用数据库函数执行单条 UPDATE ... SET total_visits = total_visits + 1，
+    避免先读后写在并发下丢失计数（函数定义见 supabase_schema.sql）"""
+    try:
+        supabase.rpc('increment_site_visits', {'delta': 1}).execute()
+    except Exception as e:
+        print(f"更新访问量失败: {e}")
+
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('index'))
+    record_site_visit()
     return render_template('dashboard.html', username=session['username'])
 
 @app.route('/news')
 def news():
     if 'user_id' not in session:
         return redirect(url_for('index'))
+    record_site_visit()
     return render_template('news.html', username=session['username'])
 
 @app.route('/api/news')
@@ -278,23 +362,19 @@ def get_user():
     
     user = user_response.data[0]
     
-    # 更新网站总访问量
-    stats_response = supabase.table('site_stat').select('*').execute()
-    if not stats_response.data:
-        supabase.table('site_stat').insert({'total_visits': 1}).execute()
-        total_visits = 1
-    else:
-        current_visits = stats_response.data[0]['total_visits'] or 0
-        supabase.table('site_stat').update({'total_visits': current_visits + 1}).execute()
-        total_visits = current_visits + 1
+    # 只读取网站总访问量，计数在页面访问时原子递增
+    stats_response = supabase.table('site_stats').select('total_visits').execute()
+    total_visits = sum(row['total_visits'] or 0 for row in stats_response.data or [])
 
-    return jsonify({
+    resp = jsonify({
         'authenticated': True,
         'username': user['username'],
         'email': user['email'],
         'created_at': user['created_at'],
         'site_total_visits': total_visits
     })
+    resp.headers['Cache-Control'] = 'private, max-age=30'
+    return resp
 
 @app.route('/api/view/<int:article_id>', methods=['POST'])
 def record_view(article_id):
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+独立 RSS 抓取进程
+
+与 Web 进程分开运行，Web worker 只处理请求：
+    python -m fetcher          # 常驻运行，按自适应调度抓取
+    python -m fetcher --once   # 抓取一轮全部源后退出（适合 cron）
+
+多个抓取进程（可跨主机）通过数据库租约互斥，同一时刻只有一个在抓取，
+其余待机，持有者退出或租约过期后自动接管。
+"""
+
+import argparse
+import signal
+import threading
+
+from app import (
+    app,
+    init_db,
+    fetch_and_store_rss,
+    fetcher_owner_id,
+    acquire_fetcher_lease,
+    release_fetcher_lease,
+    run_fetcher_loop,
+    FETCH_LIMIT,
+)
+
+
+def run_once(owner: str) -> int:
+    """获得租约后抓取一轮，未获得租约时直接退出。"""
+    with app.app_context():
+        if not acquire_fetcher_lease(owner):
+            print("已有其他抓取器持有租约，跳过本次抓取")
+            return 0
+        try:
+            fetch_and_store_rss(FETCH_LIMIT)
+        finally:
+            release_fetcher_lease(owner)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="NewsBoard RSS 抓取器")
+    parser.add_argument('--once', action='store_true', help='只抓取一轮后退出')
+    args = parser.parse_args()
+
+    with app.app_context():
+        init_db()
+
+    owner = fetcher_owner_id()
+    if args.once:
+        return run_once(owner)
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    print(f"抓取器 {owner} 启动")
+    run_fetcher_loop(stop_event, owner)
+    print(f"抓取器 {owner} 已退出")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
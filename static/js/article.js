@@ -4,60 +4,80 @@ document.addEventListener('DOMContentLoaded', function() {
 
 function initializeArticle() {
     loadComments();
+    document.getElementById('loadMoreComments').addEventListener('click', () => loadComments(false));
     setupCommentForm();
     updateViewCount();
 }
 
 let activeReplyForm = null;
 const COMMENT_MAX_LENGTH = 1000;
+let commentsCursor = null;
+let commentsLoading = false;
+let commentsTotal = 0;
+
+// 按游标请求一页评论（顶层评论或某条评论的回复）
+async function fetchCommentPage(url, cursor) {
+    const params = new URLSearchParams();
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const query = params.toString();
+    const response = await fetch(query ? `${url}?${query}` : url);
+    if (!response.ok) {
+        throw new Error('获取评论失败');
+    }
+    return response.json();
+}
+
+// 加载评论列表：reset 时重新加载第一页，否则按游标追加下一页顶层评论
+async function loadComments(reset = true) {
+    if (commentsLoading) return;
+    commentsLoading = true;
 
-// 加载评论列表
-async function loadComments() {
     try {
-        const response = await fetch(`/api/comments/${articleId}`);
-        if (!response.ok) {
-            throw new Error('获取评论失败');
-        }
-        
-        const data = await response.json();
+        const data = await fetchCommentPage(`/api/comments/${articleId}`, reset ? null : commentsCursor);
         const comments = data.comments || [];
-        const totalCount = typeof data.total_count === 'number' ? data.total_count : comments.length;
+
+        if (reset) {
+            document.getElementById('commentsList').innerHTML = '';
+            activeReplyForm = null;
+        }
+        commentsCursor = data.next_cursor || null;
+        if (typeof data.total_count === 'number') {
+            commentsTotal = data.total_count;
+            updateCommentsCount(commentsTotal);
+        }
 
         renderComments(comments);
-        updateCommentsCount(totalCount);
+        document.getElementById('loadMoreComments').style.display = data.has_more ? 'block' : 'none';
         
     } catch (error) {
         console.error('加载评论失败:', error);
         showError('加载评论失败，请稍后重试');
+    } finally {
+        commentsLoading = false;
     }
 }
 
-// 渲染评论列表
+// 追加一页顶层评论，已在页面上的评论（例如刚发表的）不重复渲染
 function renderComments(comments) {
     const commentsList = document.getElementById('commentsList');
     const noComments = document.getElementById('noComments');
-    activeReplyForm = null;
-    
-    if (comments.length === 0) {
-        commentsList.innerHTML = '';
-        noComments.style.display = 'block';
-        return;
-    }
-    
-    noComments.style.display = 'none';
-    commentsList.innerHTML = '';
-    
+
     comments.forEach(comment => {
-        const commentElement = createCommentElement(comment, 0);
-        commentsList.appendChild(commentElement);
+        if (commentsList.querySelector(`:scope > [data-comment-id="${comment.id}"]`)) return;
+        commentsList.appendChild(createCommentElement(comment, 0));
     });
+
+    noComments.style.display = commentsList.children.length === 0 ? 'block' : 'none';
 }
 
-// 创建单个评论元素
+// 创建单个评论元素；回复不随评论下发，有回复时显示展开按钮按需加载
 function createCommentElement(comment, depth = 0) {
     const div = document.createElement('div');
     div.className = depth === 0 ? 'comment-item' : 'comment-item comment-reply-item';
     div.dataset.commentId = comment.id;
+    div.dataset.depth = depth;
     
     const time = new Date(comment.created_at).toLocaleString('zh-CN');
     const safeUsername = escapeHtml(comment.username || '未知用户');
@@ -88,20 +108,72 @@ function createCommentElement(comment, depth = 0) {
     actions.appendChild(replyButton);
     div.appendChild(actions);
 
-    if (Array.isArray(comment.replies) && comment.replies.length > 0) {
-        const repliesWrapper = document.createElement('div');
-        repliesWrapper.className = 'comment-replies';
-        comment.replies.forEach(reply => {
-            repliesWrapper.appendChild(createCommentElement(reply, depth + 1));
-        });
-        div.appendChild(repliesWrapper);
+    const repliesWrapper = document.createElement('div');
+    repliesWrapper.className = 'comment-replies';
+    div.appendChild(repliesWrapper);
+
+    if (comment.reply_count > 0) {
+        const moreButton = document.createElement('button');
+        moreButton.type = 'button';
+        moreButton.className = 'comment-action-button comment-replies-more';
+        moreButton.innerHTML = `<i class="fas fa-comments"></i> 查看 ${comment.reply_count} 条回复`;
+        moreButton.addEventListener('click', () => loadReplies(div, comment, depth + 1, moreButton));
+        div.appendChild(moreButton);
     }
     
     return div;
 }
 
+// 加载某条评论的下一页回复，没有更多时隐藏按钮
+async function loadReplies(commentElement, comment, depth, moreButton) {
+    if (moreButton.disabled) return;
+    moreButton.disabled = true;
+    const originalHtml = moreButton.innerHTML;
+    moreButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> 加载中...';
+
+    try {
+        const data = await fetchCommentPage(
+            `/api/comments/${articleId}/replies/${comment.id}`,
+            commentElement.dataset.repliesCursor
+        );
+        const repliesWrapper = commentElement.querySelector(':scope > .comment-replies');
+        (data.comments || []).forEach(reply => {
+            if (repliesWrapper.querySelector(`:scope > [data-comment-id="${reply.id}"]`)) return;
+            repliesWrapper.appendChild(createCommentElement(reply, depth));
+        });
+
+        if (data.has_more) {
+            commentElement.dataset.repliesCursor = data.next_cursor;
+            moreButton.innerHTML = '<i class="fas fa-comments"></i> 加载更多回复';
+        } else {
+            moreButton.remove();
+        }
+    } catch (error) {
+        console.error('加载回复失败:', error);
+        showError('加载回复失败，请稍后重试');
+        moreButton.innerHTML = originalHtml;
+    } finally {
+        moreButton.disabled = false;
+    }
+}
+
+// 把刚发表的评论直接插入页面，无需重新加载整个列表
+function insertNewComment(comment, parentElement) {
+    if (parentElement) {
+        const depth = Number(parentElement.dataset.depth || 0) + 1;
+        const repliesWrapper = parentElement.querySelector(':scope > .comment-replies');
+        repliesWrapper.insertBefore(createCommentElement(comment, depth), repliesWrapper.firstChild);
+    } else {
+        const commentsList = document.getElementById('commentsList');
+        commentsList.insertBefore(createCommentElement(comment, 0), commentsList.firstChild);
+        document.getElementById('noComments').style.display = 'none';
+    }
+    commentsTotal += 1;
+    updateCommentsCount(commentsTotal);
+}
+
 function toggleReplyForm(commentElement, comment) {
-    const existingForm = commentElement.querySelector('.reply-form');
+    const existingForm = commentElement.querySelector(':scope > .reply-form');
     if (existingForm) {
         existingForm.remove();
         if (activeReplyForm && activeReplyForm.element === commentElement) {
@@ -115,8 +187,8 @@ function toggleReplyForm(commentElement, comment) {
         activeReplyForm = null;
     }
 
-    const form = createReplyForm(comment);
-    const repliesBlock = commentElement.querySelector('.comment-replies');
+    const form = createReplyForm(commentElement, comment);
+    const repliesBlock = commentElement.querySelector(':scope > .comment-replies');
     if (repliesBlock) {
         commentElement.insertBefore(form, repliesBlock);
     } else {
@@ -131,7 +203,7 @@ function toggleReplyForm(commentElement, comment) {
     }
 }
 
-function createReplyForm(comment) {
+function createReplyForm(commentElement, comment) {
     const wrapper = document.createElement('div');
     wrapper.className = 'reply-form';
 
@@ -160,7 +232,7 @@ function createReplyForm(comment) {
         }
     });
 
-    submitButton.addEventListener('click', () => submitReply(comment.id, textarea, submitButton));
+    submitButton.addEventListener('click', () => submitReply(commentElement, comment.id, textarea, submitButton));
 
     actions.appendChild(cancelButton);
     actions.appendChild(submitButton);
@@ -171,7 +243,7 @@ function createReplyForm(comment) {
     return wrapper;
 }
 
-async function submitReply(parentId, textarea, submitButton) {
+async function submitReply(commentElement, parentId, textarea, submitButton) {
     const content = textarea.value.trim();
 
     if (!content) {
@@ -207,7 +279,7 @@ async function submitReply(parentId, textarea, submitButton) {
                 activeReplyForm = null;
             }
 
-            await loadComments();
+            insertNewComment(data.comment, commentElement);
         } else {
             showError(data.message || '回复失败');
         }
@@ -291,8 +363,7 @@ async function submitComment() {
             document.getElementById('charCount').classList.remove('warning');
             submitButton.disabled = true;
             
-            // 重新加载评论
-            await loadComments();
+            insertNewComment(data.comment, null);
             
             // 滚动到最新评论
             const commentsList = document.getElementById('commentsList');
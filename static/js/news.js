@@ -2,7 +2,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeNews();
 });
 
-let newsOffset = 0;
+let nextCursor = null;
 const newsLimit = 30;
 let isLoading = false;
 let hasMore = true;
@@ -10,7 +10,30 @@ let hasMore = true;
 function initializeNews() {
     window.addEventListener('scroll', handleScroll, { passive: true });
     document.addEventListener('scroll', handleScroll, { passive: true });
-    // 首次加载
+    // 首次加载，之后通过 SSE 接收新文章
+    loadMoreNews().then(subscribeNewsStream);
+}
+
+function subscribeNewsStream() {
+    if (!window.EventSource) return;
+    // 断线后浏览器会自动重连并携带 Last-Event-ID，服务端据此补发错过的文章
+    const source = new EventSource('/api/stream');
+    source.addEventListener('items', (e) => {
+        try {
+            renderNewsItems(JSON.parse(e.data), true);
+        } catch (err) {
+            console.error(err);
+        }
+    });
+    // 错过的文章太多时服务端要求重新加载列表
+    source.addEventListener('reset', () => reloadNews());
+}
+
+function reloadNews() {
+    document.getElementById('newsList').innerHTML = '';
+    document.getElementById('endIndicator').style.display = 'none';
+    nextCursor = null;
+    hasMore = true;
     loadMoreNews();
 }
 
@@ -32,7 +55,9 @@ async function loadMoreNews() {
     toggleLoading(true);
 
     try {
-        const resp = await fetch(`/api/news?offset=${newsOffset}&limit=${newsLimit}`);
+        const params = new URLSearchParams({ limit: newsLimit });
+        if (nextCursor) params.set('cursor', nextCursor);
+        const resp = await fetch(`/api/news?${params.toString()}`);
         if (resp.status === 401) {
             window.location.href = '/';
             return;
@@ -42,8 +67,8 @@ async function loadMoreNews() {
         }
         const data = await resp.json();
         renderNewsItems(data.items || []);
-        newsOffset += (data.items || []).length;
-        hasMore = !!data.has_more;
+        nextCursor = data.next_cursor || null;
+        hasMore = !!data.has_more && !!nextCursor;
         
         if (!hasMore) {
             document.getElementById('endIndicator').style.display = 'block';
@@ -57,11 +82,14 @@ async function loadMoreNews() {
     }
 }
 
-function renderNewsItems(items) {
+function renderNewsItems(items, prepend = false) {
     const grid = document.getElementById('newsList');
     items.forEach(item => {
+        // 推送的文章可能已经在列表中
+        if (grid.querySelector(`.news-card[data-id="${item.id}"]`)) return;
         const card = document.createElement('div');
         card.className = 'news-card';
+        card.dataset.id = item.id;
         
         const thumb = item.thumbnail_url || item.image_url;
         const imageHtml = thumb ? 
@@ -77,7 +105,7 @@ function renderNewsItems(items) {
                     <span class="news-card-source">${escapeHtml(item.source || '')}</span>
                     <span class="news-card-time">${formatDateTime(item.published_at)}</span>
                 </div>
-                <div class="news-card-summary">${truncateHtml(item.summary || '', 120)}</div>
+                <div class="news-card-summary">${escapeHtml(item.excerpt || '')}</div>
                 <div class="news-card-actions">
                     <span class="news-card-action" data-view-count="${item.id}">
                         <i class="far fa-eye"></i> <span id="view-${item.id}">${item.view_count || 0}</span> 浏览
@@ -86,7 +114,12 @@ function renderNewsItems(items) {
                 </div>
             </div>
         `;
-        grid.appendChild(card);
+        if (prepend) {
+            // 推送按 id 升序到达，依次插到最前面，最新的在最上方
+            grid.insertBefore(card, grid.firstChild);
+        } else {
+            grid.appendChild(card);
+        }
     });
 }
 
@@ -114,15 +147,6 @@ function escapeHtml(str) {
         .replace(/'/g, '&#39;');
 }
 
-function truncateHtml(html, maxLen) {
-    const div = document.createElement('div');
-    div.innerHTML = html;
-    let text = div.textContent || div.innerText || '';
-    text = removeUrls(text);
-    if (text.length <= maxLen) return escapeHtml(text);
-    return escapeHtml(text.slice(0, maxLen)) + '...';
-}
-
 async function recordView(articleId, linkElement) {
     try {
         const resp = await fetch(`/api/view/${articleId}`, {
@@ -147,19 +171,3 @@ async function recordView(articleId, linkElement) {
     // 允许正常跳转
     return true;
 }
-
-// 过滤纯文本 URL 与常见"Article URL/Comments URL"等提示行
-function removeUrls(text) {
-    return String(text)
-        // 移除常见英文提示行
-        .replace(/\b(Article URL|Comments URL)\s*:\s*\S+/gi, '')
-        // 移除 http/https URL
-        .replace(/https?:\/\/\S+/gi, '')
-        // 移除以 www 开头的域名
-        .replace(/\bwww\.[\w.-]+\.[a-z]{2,}(\/\S*)?/gi, '')
-        // 合并多余空白
-        .replace(/\s{2,}/g, ' ')
-        .trim();
-}
-
-
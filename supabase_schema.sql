@@ -59,6 +59,27 @@ CREATE INDEX IF NOT EXISTS idx_comments_user_id ON comments(user_id);
 -- 插入初始网站统计数据
 INSERT INTO site_stats (total_visits) VALUES (0) ON CONFLICT DO NOTHING;
 
+-- 网站访问量原子递增（app_supabase.py 通过 rpc 调用）
+-- 单条 UPDATE 在行锁内完成读改写，并发访问不会丢失计数；表为空时插入第一行
+CREATE OR REPLACE FUNCTION increment_site_visits(delta INTEGER DEFAULT 1)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    new_total INTEGER;
+BEGIN
+    UPDATE site_stats
+       SET total_visits = COALESCE(total_visits, 0) + delta,
+           updated_at = NOW()
+     WHERE id = (SELECT MIN(id) FROM site_stats)
+    RETURNING total_visits INTO new_total;
+    IF NOT FOUND THEN
+        INSERT INTO site_stats (total_visits) VALUES (delta) RETURNING total_visits INTO new_total;
+    END IF;
+    RETURN new_total;
+END;
+$$;
+
 -- 启用行级安全策略（RLS）
 ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE rss_items ENABLE ROW LEVEL SECURITY;